@@ -1,11 +1,17 @@
 import streamlit as st
-import json
 from datetime import date
 from google_sheet_utils import get_sheet
+from instrumentation import collect_run, timing_panel
+from premium_checks import validate_premiums
+from policy_tape import append_policy_rows, parse_premiums_checked, policy_row, read_tape, validate_tape
 
 st.set_page_config(page_title="Policy Onboarding", layout="centered")
 st.title("📥 Life Settlement Policy Onboarding")
 
+# Optional per-run timing panel (spans are only recorded while it is on)
+show_timings = st.sidebar.checkbox("⏱️ Show timings")
+spans = collect_run(show_timings)
+
 # 🔄 Restart Onboarding Button
 if st.button("🔄 Start Over"):
     st.session_state.step = 1
@@ -13,6 +19,34 @@ if st.button("🔄 Start Over"):
     st.session_state.premium_years = []
     st.experimental_rerun()
 
+# 📄 Bulk onboarding: validate a whole tape, then write it in batched appends
+with st.expander("📄 Bulk upload a policy tape (CSV/XLSX)"):
+    st.markdown(
+        "Columns: `insured_name, dob, carrier, le_months, le_report_date, death_benefit, internal_cost`, "
+        "plus either `premiums_json` or one column per year (e.g. `2025`) holding the premiums, "
+        "one per line or separated by `;`. Dates as YYYY-MM-DD."
+    )
+    tape = st.file_uploader("Policy tape", type=["csv", "xlsx"])
+    if tape is not None:
+        tape_rows, tape_errors, tape_warnings = validate_tape(read_tape(tape, tape.name))
+        if tape_warnings:
+            st.warning(f"⚠️ {len(tape_warnings)} line(s) have premium schedules worth a second look (they can still be saved):")
+            st.code("\n".join(tape_warnings))
+        if tape_errors:
+            st.error(f"❌ {len(tape_errors)} line(s) need fixing before anything is saved:")
+            st.code("\n".join(tape_errors))
+        elif not tape_rows:
+            st.warning("The tape has no policies.")
+        else:
+            st.write(f"{len(tape_rows)} policies ready to save.")
+            if st.button(f"Save {len(tape_rows)} Policies"):
+                try:
+                    with st.spinner("Saving to Google Sheets..."):
+                        saved = append_policy_rows(get_sheet(), tape_rows)
+                    st.success(f"✅ {saved} policies saved to Google Sheets.")
+                except Exception as e:
+                    st.error(f"❌ Failed to save tape: {e}")
+
 if "step" not in st.session_state:
     st.session_state.step = 1
 if "policy_inputs" not in st.session_state:
@@ -60,39 +94,26 @@ if st.session_state.step == 2:
     for year in st.session_state.premium_years:
         premium_inputs[year] = st.text_area(f"Premiums for {year}", key=str(year), height=150)
 
-    if st.button("Save Policy"):
-        def parse_premiums(inputs_dict):
-            premiums = {}
-            for year, val in inputs_dict.items():
-                cleaned_lines = []
-                for line in val.strip().splitlines():
-                    line = line.strip().replace("$", "").replace(",", "")
-                    if line:
-                        try:
-                            cleaned_lines.append(float(line))
-                        except ValueError:
-                            continue
-                if cleaned_lines:
-                    premiums[year] = cleaned_lines
-            return premiums
-
-        premiums = parse_premiums(premium_inputs)
-        sheet = get_sheet()
+    # Checked on every rerun so problems show before saving; errors block the save
+    premiums, rejected = parse_premiums_checked(premium_inputs)
+    inputs = st.session_state.policy_inputs
+    report = validate_premiums(premiums, inputs["le_months"], inputs["le_report_date"], rejected=rejected)
+    for message in report["errors"]:
+        st.error(f"❌ {message}")
+    for message in report["warnings"]:
+        st.warning(f"⚠️ {message}")
 
+    if st.button("Save Policy"):
         if not premiums:
             st.error("❌ No premiums parsed. Please check your input.")
+        elif report["errors"]:
+            st.error("❌ Fix the premium errors above before saving.")
         else:
             try:
-                sheet.append_row([
-                    st.session_state.policy_inputs["insured_name"],
-                    st.session_state.policy_inputs["dob"],
-                    st.session_state.policy_inputs["carrier"],
-                    st.session_state.policy_inputs["le_months"],
-                    st.session_state.policy_inputs["le_report_date"],
-                    st.session_state.policy_inputs["death_benefit"],
-                    st.session_state.policy_inputs["internal_cost"],
-                    json.dumps(premiums)
-                ])
+                get_sheet().append_row(policy_row(inputs, report["cell"]))
                 st.success(f"✅ Policy for {st.session_state.policy_inputs['insured_name']} saved to Google Sheets.")
             except Exception as e:
                 st.error(f"❌ Failed to save policy: {e}")
+
+if show_timings:
+    timing_panel(spans)
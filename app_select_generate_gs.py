@@ -1,36 +1,69 @@
 import streamlit as st
-import json
-from google_sheet_utils import get_sheet
-from template_generator import generate_return_template, generate_resale_template
+from instrumentation import collect_run, span, timing_panel
+from policy_store import FULL_SYNC_INTERVAL_S, PolicyStore, SheetsBackend
+from premium_codec import decode_schedule
+from pricing_cache import PricingCache
 
-# Load policies from Google Sheets
-sheet = get_sheet()
-records = sheet.get_all_records()
+st.set_page_config(page_title="Generate Purchase Template", layout="centered")
+st.title("Life Settlement Template Generator")
 
-# Convert to dictionary
+# Optional per-run timing panel (spans are only recorded while it is on)
+show_timings = st.sidebar.checkbox("⏱️ Show timings")
+spans = collect_run(show_timings)
+
+# Local SQLite copy of the policy sheet, shared by every session of this process
+@st.cache_resource
+def get_policy_store() -> PolicyStore:
+    return PolicyStore(backend=SheetsBackend())
+
+# Priced + rendered templates, reused for repeat downloads on the same day
+@st.cache_resource
+def get_pricing_cache() -> PricingCache:
+    return PricingCache(max_entries=256)
+
+# Pull newly appended rows at most once a minute; every FULL_SYNC_INTERVAL_S the store
+# re-hashes all rows so in-place edits and deletions are picked up too
+@st.cache_data(ttl=60, show_spinner=False)
+def sync_policy_store() -> dict:
+    return get_policy_store().sync()
+
+# Full record of one policy, premiums decoded; keyed by row hash so edits are picked up
+@st.cache_data(ttl=600, show_spinner=False)
+def load_policy(row_idx: int, row_hash: str) -> dict:
+    row = get_policy_store().record_at(row_idx)
+    with span("premiums.decode", row=row_idx):
+        return {**row, "monthly_premiums": decode_schedule(row["premiums_json"])}
+
+# Light index from the local store (kept in sync with Google Sheets): key -> (row, name, hash)
+sync_policy_store()
 policies = {
-    row['insured_name'].lower().replace(" ", "_"): {
-        **row,
-        "monthly_premiums": json.loads(row["premiums_json"])
-    }
-    for row in records
+    name.lower().replace(" ", "_"): (row_idx, name, row_hash)
+    for row_idx, name, row_hash in get_policy_store().index()
 }
 
 if not policies:
     st.error("❌ No saved policies found. Please onboard policies first.")
     st.stop()
 
-st.set_page_config(page_title="Generate Purchase Template", layout="centered")
-st.title("Life Settlement Template Generator")
+st.sidebar.caption(
+    f"New policies show up within a minute; edits to saved rows within {FULL_SYNC_INTERVAL_S // 60} minutes. "
+    "Refresh to pick them up now."
+)
+if st.sidebar.button("🔄 Refresh from Google Sheets"):
+    get_policy_store().sync(full=True)
+    sync_policy_store.clear()
+    load_policy.clear()
+    st.rerun()
 
 # List of insured names
 policy_keys = list(policies.keys())
 
 # UI to select policy
-selection = st.selectbox("Choose a policy:", options=policy_keys, format_func=lambda k: policies[k]["insured_name"])
+selection = st.selectbox("Choose a policy:", options=policy_keys, format_func=lambda k: policies[k][1])
 
 if selection:
-    policy = policies[selection]
+    row_idx, _, row_hash = policies[selection]
+    policy = load_policy(row_idx, row_hash)
 
     st.write("**Carrier:**", policy["carrier"])
     st.write("**DOB:**", policy["dob"])
@@ -48,48 +81,58 @@ if selection:
 
     investment = st.number_input("Enter Client Cost", min_value=0.0, step=1000.0, value=internal_cost)
 
+    include_grid = st.checkbox(
+        "Include resale sensitivity grid",
+        help="Adds resale price and Client 1 return for every month to LE+36 at 10–30% target returns.",
+    )
+
+    include_simulation = st.checkbox(
+        "Include mortality simulation",
+        help="Adds a Monte Carlo sheet (100,000 maturities drawn from a Gompertz curve calibrated to LE) "
+             "with percentiles of profit and return to the purchase template.",
+    )
+
     col1, col2 = st.columns(2)
 
     with col1:
         if st.button("Generate Purchase Template"):
-            monthly_premiums = {int(k): v for k, v in policy["monthly_premiums"].items()}
-
             output_filename = f"purchase_template_{selection}.xlsx"
-            output_path = generate_return_template(
-                insured_name=policy["insured_name"],
-                dob=policy["dob"],
-                carrier=policy["carrier"],
-                le_months=policy["le_months"],
-                le_report_date=policy["le_report_date"],
-                death_benefit=policy["death_benefit"],
-                investment=investment,
-                monthly_premiums=monthly_premiums,
-                output_filename=output_filename
+            _, data = get_pricing_cache().template(
+                "purchase", policy, investment,
+                simulate_paths=100_000 if include_simulation else 0
             )
 
-            with open(output_path, "rb") as f:
-                st.success("✅ Template generated successfully!")
-                st.download_button("📥 Download Excel", f, file_name=output_filename)
+            st.success("✅ Template generated successfully!")
+            st.download_button("📥 Download Excel", data, file_name=output_filename)
 
     with col2:
         if st.button("Generate Resale Template"):
-            monthly_premiums = {int(k): v for k, v in policy["monthly_premiums"].items()}
-
             output_filename = f"resale_template_{selection}.xlsx"
-            output_path = generate_resale_template(
-                insured_name=policy["insured_name"],
-                dob=policy["dob"],
-                carrier=policy["carrier"],
-                le_months=policy["le_months"],
-                le_report_date=policy["le_report_date"],
-                death_benefit=policy["death_benefit"],
-                investment=investment,
-                monthly_premiums=monthly_premiums,
-                output_filename=output_filename
+            _, data = get_pricing_cache().template(
+                "resale", policy, investment, sensitivity=include_grid
             )
 
-            with open(output_path, "rb") as f:
-                st.success("✅ Template generated successfully!")
-                st.download_button("📥 Download Excel", f, file_name=output_filename)
-
-
+            st.success("✅ Template generated successfully!")
+            st.download_button("📥 Download Excel", data, file_name=output_filename)
+
+# Several policies side by side in one workbook (client cost = each policy's internal cost)
+with st.expander("📊 Compare policies"):
+    compare_keys = st.multiselect("Policies to compare:", options=policy_keys, format_func=lambda k: policies[k][1])
+    if compare_keys and st.button(f"Generate Comparison ({len(compare_keys)} policies)"):
+        from template_generator import generate_comparison_workbook_bytes
+
+        compare_policies = []
+        for key in compare_keys:
+            key_row, _, key_hash = policies[key]
+            row = load_policy(key_row, key_hash)
+            try:
+                cost = float(row.get("internal_cost", 0.0) or 0.0)
+            except (ValueError, TypeError):
+                cost = 0.0
+            compare_policies.append({**row, "investment": cost})
+        data = generate_comparison_workbook_bytes(compare_policies)
+        st.success("✅ Comparison workbook generated!")
+        st.download_button("📥 Download Comparison", data, file_name="policy_comparison.xlsx")
+
+if show_timings:
+    timing_panel(spans)
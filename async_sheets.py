@@ -0,0 +1,309 @@
+"""
+Asyncio access to the Sheets REST API (v4), next to the blocking gspread layer in
+google_sheet_utils.
+
+Each HTTP call is a stdlib urllib request run in a worker thread, so several
+worksheets/ranges are fetched concurrently and appends are pipelined. Every request
+first takes a token from a token bucket sized to the Sheets per-user quota; 429
+answers are retried with backoff, and so are 5xx answers to reads (not appends).
+`base_url` can point at a local fake server.
+
+    records = run(AsyncSheetsClient().fetch_worksheets(["Sheet1", "Archive"]))
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Sequence, Union
+from urllib.error import HTTPError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+
+from google_sheet_utils import SPREADSHEET_KEY
+from policy_store import _numericise
+
+SHEETS_API_URL = "https://sheets.googleapis.com/v4"
+REQUESTS_PER_MINUTE = 60    # default Sheets quota per user per minute
+MAX_CONCURRENCY = 8
+APPEND_BATCH_ROWS = 200
+
+
+class SheetsAPIError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Sheets API error {status}: {message}")
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average with bursts of up to `capacity`.
+    Waiters are served in arrival order: each acquire reserves its tokens up front
+    (the balance may go negative) and sleeps until they have refilled. The state is
+    guarded by a threading lock rather than an asyncio one, so one bucket keeps
+    enforcing the quota across event loops (each run() starts a new one).
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: float) -> float:
+        """Take `tokens` now; returns how long to wait until they are actually available."""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return max(-self._tokens, 0.0) / self.rate
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def _a1(title: Optional[str], cells: Optional[str] = None) -> str:
+    """A1 range for a worksheet title (quoted); no title means the first sheet."""
+    if not title:
+        return cells or "A:ZZZ"
+    sheet = "'" + title.replace("'", "''") + "'"
+    return f"{sheet}!{cells}" if cells else sheet
+
+
+def _records(values: List[List]) -> List[Dict]:
+    """Rows -> dicts keyed by the header row, numericised like get_all_records."""
+    if not values:
+        return []
+    header = values[0]
+    width = len(header)
+    return [
+        dict(zip(header, _numericise(list(r[:width]) + [""] * (width - len(r)))))
+        for r in values[1:]
+    ]
+
+
+class AsyncSheetsClient:
+    """
+    Concurrent Sheets client for one spreadsheet.
+
+    `token` is an access token or a callable returning one (default: the
+    service-account token from google_sheet_utils). At most `max_concurrency`
+    requests are in flight and `requests_per_minute` bounds the request rate.
+    One client can be reused across run() calls (e.g. kept between Streamlit
+    reruns): the rate limit carries over, and the concurrency limit is created
+    for whichever event loop is running.
+    """
+
+    def __init__(
+        self,
+        spreadsheet_key: str = SPREADSHEET_KEY,
+        base_url: str = SHEETS_API_URL,
+        token: Union[str, Callable[[], str], None] = None,
+        requests_per_minute: float = REQUESTS_PER_MINUTE,
+        burst: Optional[int] = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        timeout: float = 30.0,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+    ):
+        if token is None:
+            from google_sheet_utils import access_token
+            token = access_token
+        self.spreadsheet_key = spreadsheet_key
+        self.base_url = base_url.rstrip("/")
+        self._token = token
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst or max(int(requests_per_minute) // 6, 1))
+        self.max_concurrency = max_concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+        self.stats = {"requests": 0, "retries": 0}
+
+    # === transport ===
+    def _loop_slots(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one event loop; make a fresh one when the loop changes
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots, self._slots_loop = asyncio.Semaphore(self.max_concurrency), loop
+        return self._slots
+
+    def _send(self, method: str, url: str, body: Optional[Dict]) -> Dict:
+        # Runs in a worker thread
+        token = self._token() if callable(self._token) else self._token
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = Request(url, data=data, method=method, headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        })
+        try:
+            with urlopen(req, timeout=self.timeout) as resp:
+                payload = resp.read()
+        except HTTPError as e:
+            raise SheetsAPIError(e.code, e.read().decode("utf-8", "replace")[:500]) from None
+        return json.loads(payload) if payload else {}
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict] = None,
+        body: Optional[Dict] = None,
+        idempotent: bool = True,
+    ) -> Dict:
+        """
+        One rate-limited API call on the spreadsheet; `path` follows /spreadsheets/{key}.
+        429 is always retried (the request was not applied). 5xx is retried only when
+        `idempotent`: a failed append may still have been written, and resending it
+        would duplicate rows.
+        """
+        url = f"{self.base_url}/spreadsheets/{self.spreadsheet_key}{path}"
+        if params:
+            url += "?" + urlencode(params, doseq=True)
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                async with self._loop_slots():
+                    self.stats["requests"] += 1
+                    return await asyncio.to_thread(self._send, method, url, body)
+            except SheetsAPIError as e:
+                if attempt == self.max_retries or not (e.status == 429 or (idempotent and e.retryable)):
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.base_delay * (2 ** attempt) + random.uniform(0, self.base_delay))
+        raise AssertionError("unreachable")
+
+    # === reads ===
+    async def get_values(self, range_: str) -> List[List]:
+        resp = await self.request("GET", f"/values/{quote(range_, safe='')}")
+        return resp.get("values", [])
+
+    async def get_many(self, ranges: Sequence[str]) -> List[List[List]]:
+        """Each range as its own request, all in flight at once; results in input order."""
+        return list(await asyncio.gather(*(self.get_values(r) for r in ranges)))
+
+    async def batch_get(self, ranges: Sequence[str]) -> List[List[List]]:
+        """Several ranges in a single values:batchGet request (one quota unit)."""
+        resp = await self.request("GET", "/values:batchGet", params={"ranges": list(ranges)})
+        return [vr.get("values", []) for vr in resp.get("valueRanges", [])]
+
+    async def get_all_records(self, title: Optional[str] = None) -> List[Dict]:
+        return _records(await self.get_values(_a1(title)))
+
+    async def fetch_worksheets(self, titles: Sequence[Optional[str]]) -> Dict[Optional[str], List[Dict]]:
+        """get_all_records for several worksheets concurrently, keyed by title."""
+        results = await asyncio.gather(*(self.get_all_records(t) for t in titles))
+        return dict(zip(titles, results))
+
+    # === writes ===
+    async def append_rows(self, title: Optional[str], rows: List[List], value_input_option: str = "RAW") -> Dict:
+        return await self.request(
+            "POST",
+            f"/values/{quote(_a1(title, 'A1'), safe='')}:append",
+            params={"valueInputOption": value_input_option, "insertDataOption": "INSERT_ROWS"},
+            body={"values": rows},
+            idempotent=False,
+        )
+
+    def pipeline(self, title: Optional[str] = None, max_batch: int = APPEND_BATCH_ROWS) -> "AppendPipeline":
+        return AppendPipeline(self, title, max_batch)
+
+
+class AppendPipeline:
+    """
+    Ordered, pipelined appends to one worksheet. `submit` queues a row and returns
+    at once; a background writer sends whatever has queued up (up to `max_batch`
+    rows) as one append while callers keep producing. Pipelines for different
+    worksheets write concurrently.
+
+    The first failed append is re-raised by `flush`/`aclose` (and so on leaving the
+    `async with` block); rows queued after it are failed without being sent, so
+    nothing lands out of order behind a gap.
+
+        async with client.pipeline("Sheet1") as p:
+            for row in rows:
+                await p.submit(row)
+    """
+
+    def __init__(self, client: AsyncSheetsClient, title: Optional[str], max_batch: int = APPEND_BATCH_ROWS):
+        self.client = client
+        self.title = title
+        self.max_batch = max_batch
+        self.written = 0
+        self._queue: "asyncio.Queue" = asyncio.Queue()
+        self._writer: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def submit(self, row: List) -> "asyncio.Future":
+        """Queue one row; the returned future resolves once it has been written."""
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run())
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, fut))
+        return fut
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                if self._error is not None:
+                    raise self._error
+                await self.client.append_rows(self.title, [row for row, _ in batch])
+                self.written += len(batch)
+                for _, fut in batch:
+                    fut.set_result(None)
+            except Exception as e:
+                if self._error is None:
+                    self._error = e
+                for _, fut in batch:
+                    fut.set_exception(e)
+                    fut.exception()  # reported by flush(); callers need not await every row
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def flush(self) -> None:
+        """Wait until every queued row has been handled; raises the first failed append."""
+        await self._queue.join()
+        if self._error is not None:
+            raise self._error
+
+    async def aclose(self) -> None:
+        try:
+            await self.flush()
+        finally:
+            if self._writer is not None:
+                self._writer.cancel()
+                self._writer = None
+
+    async def __aenter__(self) -> "AppendPipeline":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.aclose()
+            return
+        try:  # keep the block's own exception rather than a follow-on append failure
+            await self.aclose()
+        except Exception:
+            pass
+
+
+def run(coro: Coroutine) -> Any:
+    """Run a coroutine from synchronous code (e.g. the Streamlit script thread)."""
+    return asyncio.run(coro)
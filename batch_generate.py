@@ -0,0 +1,216 @@
+import argparse
+import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from premium_codec import decode_schedule
+from template_generator import (
+    generate_resale_template,
+    generate_resale_template_bytes,
+    generate_return_template,
+    generate_return_template_bytes,
+)
+
+GENERATORS = {
+    "purchase": generate_return_template,
+    "resale": generate_resale_template,
+}
+BYTES_GENERATORS = {
+    "purchase": generate_return_template_bytes,
+    "resale": generate_resale_template_bytes,
+}
+
+
+def policy_key(insured_name: str) -> str:
+    """Same key the selection app uses for a policy (lower-case, spaces -> underscores)."""
+    return str(insured_name).lower().replace(" ", "_")
+
+
+def policy_from_record(row: Dict) -> Dict:
+    """
+    Turn one `get_all_records()` row into generator keyword arguments.
+    The client cost defaults to the stored internal cost, like the selection app.
+    """
+    premiums = decode_schedule(row.get("premiums_json") or "{}")
+    try:
+        investment = float(row.get("internal_cost", 0.0) or 0.0)
+    except (ValueError, TypeError):
+        investment = 0.0
+    return {
+        "insured_name": row["insured_name"],
+        "dob": str(row["dob"]),
+        "carrier": row["carrier"],
+        "le_months": int(row["le_months"]),
+        "le_report_date": str(row["le_report_date"]),
+        "death_benefit": row["death_benefit"],
+        "investment": investment,
+        "monthly_premiums": premiums,
+    }
+
+
+def month_ends(start: date, end: date) -> List[date]:
+    """Last day of every month from `start`'s month through `end`'s month."""
+    out = []
+    y, m = start.year, start.month
+    while (y, m) <= (end.year, end.month):
+        y2, m2 = (y + 1, 1) if m == 12 else (y, m + 1)
+        out.append(date(y2, m2, 1) - timedelta(days=1))
+        y, m = y2, m2
+    return out
+
+
+def _generate_one(kind: str, row: Dict, jobs: Sequence[tuple]) -> List[Union[str, bytes]]:
+    # Runs inside a worker process; record parsing happens here too so a bad row
+    # only fails its own task. `jobs` are (as_of, output_path) pairs: the record is
+    # parsed and its premiums normalized once, then priced as of each date. Without
+    # an output path the xlsx bytes are returned.
+    kwargs = policy_from_record(row)
+    if kind == "purchase":
+        kwargs["write_only"] = True  # stream rows; same output, one pass
+    results = []
+    for as_of, output_path in jobs:
+        if output_path is None:
+            results.append(BYTES_GENERATORS[kind](**kwargs, as_of=as_of))
+        else:
+            results.append(GENERATORS[kind](**kwargs, output_filename=output_path, as_of=as_of))
+    return results
+
+
+def _unique_keys(records: List[Dict]) -> List[str]:
+    seen: Dict[str, int] = {}
+    keys = []
+    for row in records:
+        key = policy_key(row.get("insured_name", "")) or "policy"
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}_{seen[key]}")
+    return keys
+
+
+def generate_portfolio(
+    records: Iterable[Dict],
+    output_dir: Optional[str] = None,
+    zip_path: Optional[str] = None,
+    kinds: Iterable[str] = ("purchase", "resale"),
+    max_workers: Optional[int] = None,
+    as_of: Union[date, Sequence[date], None] = None,
+) -> Dict:
+    """
+    Generate purchase and/or resale workbooks for every record across a process pool.
+
+    Outputs go to `output_dir` (created if needed) and, when `zip_path` is given, are
+    also bundled into one zip. With only `zip_path`, workers render in memory and the
+    workbooks go straight into the zip. Per-policy failures are collected instead of
+    aborting the run.
+
+    Every workbook is valued as of `as_of`: one date (default: today, fixed when the
+    run starts) or several, e.g. month_ends() for a history backfill. With several
+    dates each one gets its own YYYY-MM-DD/ subfolder, and each policy's record is
+    parsed once per kind and reused for all dates.
+
+    Returns {"outputs": [paths or zip member names], "failures": [{...}], "zip_path": ...}.
+    """
+    records = list(records)
+    kinds = list(kinds)
+    dates = [as_of or date.today()] if as_of is None or isinstance(as_of, date) else sorted(set(as_of))
+    if not dates:
+        raise ValueError("Pass at least one as_of date.")
+    for kind in kinds:
+        if kind not in GENERATORS:
+            raise ValueError(f"Unknown template kind: {kind!r} (expected one of {sorted(GENERATORS)})")
+    if output_dir is None and zip_path is None:
+        raise ValueError("Pass output_dir, zip_path, or both.")
+
+    def member(d: date, name: str) -> str:
+        return name if len(dates) == 1 else f"{d.isoformat()}/{name}"
+
+    out_dir = None
+    if output_dir is not None:
+        out_dir = Path(output_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for d in dates if len(dates) > 1 else ():
+            (out_dir / d.isoformat()).mkdir(exist_ok=True)
+
+    results: Dict[str, Union[str, bytes]] = {}
+    failures: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for key, row in zip(_unique_keys(records), records):
+            for kind in kinds:
+                names = [member(d, f"{kind}_template_{key}.xlsx") for d in dates]
+                jobs = [(d, (out_dir / n).as_posix() if out_dir is not None else None) for d, n in zip(dates, names)]
+                futures[pool.submit(_generate_one, kind, row, jobs)] = (names, key, kind, row)
+
+        for fut in as_completed(futures):
+            names, key, kind, row = futures[fut]
+            try:
+                results.update(zip(names, fut.result()))
+            except Exception as e:
+                failures.append({
+                    "policy": key,
+                    "insured_name": row.get("insured_name"),
+                    "kind": kind,
+                    "error": f"{type(e).__name__}: {e}",
+                    "traceback": "".join(traceback.format_exception(e)),
+                })
+
+    if zip_path is not None:
+        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for name in sorted(results):
+                result = results[name]
+                if isinstance(result, bytes):
+                    zf.writestr(name, result)
+                else:
+                    zf.write(result, arcname=name)
+
+    outputs = sorted(results) if out_dir is None else sorted(results.values())
+    return {"outputs": outputs, "failures": failures, "zip_path": zip_path}
+
+
+def _parse_date(text: str) -> date:
+    return datetime.strptime(text, "%Y-%m-%d").date()
+
+
+def _parse_month(text: str) -> date:
+    return datetime.strptime(text, "%Y-%m").date()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate purchase/resale workbooks for every stored policy.")
+    parser.add_argument("--output-dir", help="Directory for the generated workbooks")
+    parser.add_argument("--zip", dest="zip_path", help="Bundle every workbook into this zip file")
+    parser.add_argument("--kind", action="append", choices=sorted(GENERATORS),
+                        help="Template kind to generate (repeatable; default: both)")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--as-of", action="append", type=_parse_date, metavar="YYYY-MM-DD",
+                        help="Valuation date (repeatable; default: today)")
+    parser.add_argument("--month-ends", nargs=2, type=_parse_month, metavar=("FROM", "TO"),
+                        help="Also value as of every month-end from FROM to TO (YYYY-MM)")
+    args = parser.parse_args(argv)
+    if not args.output_dir and not args.zip_path:
+        parser.error("pass --output-dir and/or --zip")
+    dates = list(args.as_of or [])
+    if args.month_ends:
+        dates += month_ends(*args.month_ends)
+
+    from google_sheet_utils import get_sheet
+    records = get_sheet().get_all_records()
+
+    report = generate_portfolio(
+        records,
+        output_dir=args.output_dir,
+        zip_path=args.zip_path,
+        kinds=args.kind or ("purchase", "resale"),
+        max_workers=args.workers,
+        as_of=dates or None,
+    )
+    print(f"✅ {len(report['outputs'])} workbooks generated from {len(records)} policies.")
+    for f in report["failures"]:
+        print(f"❌ {f['insured_name']} ({f['kind']}): {f['error']}")
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,295 @@
+"""
+Offline benchmarks for template generation.
+
+    python benchmarks.py                  # run everything
+    python benchmarks.py --stale-rows 5000
+    python benchmarks.py --policies 500 --save-baseline
+    python benchmarks.py --stale-rows 0   # generation only
+
+Generation is timed per stage (parse, compute, style, save) for both templates and
+compared against the stored baseline (benchmarks_baseline.json) when there is one.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import template_generator as tg
+from premium_codec import decode_schedule, encode_schedule
+from premium_schedule import PremiumSchedule
+from pricing import purchase_figures, resale_figures
+
+BASELINE_PATH = "benchmarks_baseline.json"
+REGRESSION_THRESHOLD = 0.25  # flag timings more than 25% slower than the baseline
+NOISE_FLOOR_S = 0.005        # timings below this are too noisy to flag
+
+
+def _timeit(fn, repeat: int = 1) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# === template reset with a long stale table ===
+def _write_stale_template(rows: int, directory: str) -> str:
+    """Copy of the purchase template saved with `rows` stale year rows below the header."""
+    wb = tg.load_workbook(tg._find_template(tg.RETURN_TEMPLATE_NAME).as_posix())
+    ws = wb.active
+    for r in range(tg.RETURN_HEADER_ROWS + 1, tg.RETURN_HEADER_ROWS + 1 + rows):
+        for c in range(1, 9):
+            ws.cell(row=r, column=c, value=r * c)
+    path = os.path.join(directory, f"stale_{rows}.xlsx")
+    wb.save(path)
+    return path
+
+
+def bench_reset_stale_rows(rows: int = 5000, legacy_rows: int = 300) -> Dict[str, float]:
+    """
+    Reset a template holding thousands of stale rows.
+    `legacy_rows` times the old one-row-at-a-time delete loop on a smaller table for
+    comparison (it is quadratic, so keep it small).
+    """
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as d:
+        path = _write_stale_template(rows, d)
+        wb = tg.load_workbook(path)
+        results[f"reset_{rows}_rows"] = _timeit(lambda: tg.reset_return_template(wb))
+        assert wb.active.max_row == tg.RETURN_HEADER_ROWS, "reset left rows behind"
+
+        # Cold load through the template cache: parse + reset once, then cheap copies
+        tg.clear_template_cache()
+        results["cache_cold_load"] = _timeit(lambda: tg.load_template(path, prepare=tg.reset_return_template))
+        results["cache_warm_load"] = _timeit(lambda: tg.load_template(path, prepare=tg.reset_return_template), repeat=5)
+
+        if legacy_rows:
+            small = tg.load_workbook(_write_stale_template(legacy_rows, d)).active
+
+            def legacy():
+                for _ in range(7, small.max_row + 1):
+                    small.delete_rows(7)
+
+            results[f"legacy_loop_{legacy_rows}_rows"] = _timeit(legacy)
+    return results
+
+
+# === synthetic policies ===
+def synthetic_policies(n: int, seed: int = 0) -> List[Dict]:
+    """
+    Policies shaped like sheet records (premiums as a JSON string) with varied
+    horizons and premium list lengths: full 12-month years, short lists that get
+    end-aligned to December, over-long years (13+ entries) and gaps between years.
+    """
+    rng = random.Random(seed)
+    this_year = date.today().year
+    out = []
+    for i in range(n):
+        le_months = rng.choice((6, 18, 36, 60, 96, 144, 240))
+        premiums: Dict[str, List[float]] = {}
+        for y in range(this_year - 1, this_year + le_months // 12 + 5):
+            shape = rng.random()
+            if shape < 0.1:
+                continue                                            # gap year
+            amount = round(rng.uniform(200, 5000), 2)
+            if shape < 0.35:
+                months = [amount] * rng.randint(1, 11)              # short list, front-filled with zeros
+            elif shape < 0.4:
+                months = [amount] * rng.randint(13, 14)             # over-long year, truncated to 12
+            else:
+                months = [round(amount * (1.0 + 0.002 * m), 2) for m in range(12)]
+            premiums[str(y)] = months
+        out.append({
+            "insured_name": f"Insured {i}",
+            "dob": f"{rng.randint(1935, 1955)}-0{rng.randint(1, 9)}-15",
+            "carrier": "Benchmark Life",
+            "le_months": le_months,
+            "le_report_date": f"{this_year - 1}-0{rng.randint(1, 9)}-01",
+            "death_benefit": rng.choice((500_000, 1_000_000, 2_500_000)),
+            "investment": rng.choice((50_000.0, 150_000.0, 400_000.0)),
+            "premiums_json": json.dumps(premiums),
+        })
+    return out
+
+
+# === generation split by stage ===
+def _parse(policy: Dict) -> PremiumSchedule:
+    return PremiumSchedule.from_year_map(json.loads(policy["premiums_json"]))
+
+
+def _encode_all(policies: List[Dict]) -> List[str]:
+    return [encode_schedule(_parse(p)) for p in policies]
+
+
+def bench_generation(policies: List[Dict]) -> Dict[str, float]:
+    """
+    Per-stage totals over all policies for both templates:
+      parse   - premiums_json decode + PremiumSchedule normalization (legacy JSON;
+                parse_v1 is the same for the premium_codec encoding)
+      compute - purchase_figures / resale_figures
+      style   - build_*_workbook (cached template clone, values, styles)
+      save    - serialize to xlsx bytes
+    plus the cold template parse, each generate_* end to end to disk (the purchase one
+    also with write_only=True, as batch_generate runs it), and the premium helpers.
+    """
+    results: Dict[str, float] = {}
+    n = len(policies)
+
+    tg.clear_template_cache()
+    results["template_parse_cold"] = _timeit(lambda: (
+        tg.load_template(tg.RETURN_TEMPLATE_NAME, prepare=tg.reset_return_template),
+        tg.load_template(tg.RESALE_TEMPLATE_NAME),
+    ))
+
+    t0 = time.perf_counter()
+    schedules = [_parse(p) for p in policies]
+    results["parse"] = time.perf_counter() - t0
+    encoded = _encode_all(policies)
+    results["parse_v1"] = _timeit(lambda: [decode_schedule(e) for e in encoded], repeat=3)
+
+    for kind in ("purchase", "resale"):
+        stages = {"compute": 0.0, "style": 0.0, "save": 0.0}
+        for p, schedule in zip(policies, schedules):
+            args = (p["dob"], p["le_months"], p["le_report_date"], p["death_benefit"], p["investment"], schedule)
+            t0 = time.perf_counter()
+            if kind == "purchase":
+                figures = purchase_figures(*args)
+                t1 = time.perf_counter()
+                wb = tg.build_return_workbook(p["insured_name"], p["carrier"], p["death_benefit"], p["investment"], figures)
+            else:
+                figures = resale_figures(*args)
+                t1 = time.perf_counter()
+                wb = tg.build_resale_workbook(p["insured_name"], p["carrier"], figures)
+            t2 = time.perf_counter()
+            tg.workbook_bytes(wb)
+            t3 = time.perf_counter()
+            stages["compute"] += t1 - t0
+            stages["style"] += t2 - t1
+            stages["save"] += t3 - t2
+        for stage, value in stages.items():
+            results[f"{kind}_{stage}"] = value
+        results[f"{kind}_policies_per_s"] = n / (results["parse"] + sum(stages.values()))
+
+    with tempfile.TemporaryDirectory() as d:
+        def generate_all(name, generate, **kwargs):
+            def run():
+                for i, p in enumerate(policies):
+                    premiums = json.loads(p["premiums_json"])
+                    generate(p["insured_name"], p["dob"], p["carrier"], p["le_months"], p["le_report_date"],
+                             p["death_benefit"], p["investment"], premiums, os.path.join(d, f"{name}_{i}.xlsx"), **kwargs)
+            return run
+        results["generate_return_to_disk"] = _timeit(generate_all("purchase", tg.generate_return_template))
+        results["generate_return_write_only_to_disk"] = _timeit(
+            generate_all("purchase_wo", tg.generate_return_template, write_only=True))
+        results["generate_resale_to_disk"] = _timeit(generate_all("resale", tg.generate_resale_template))
+
+    # Premium helpers across every schedule
+    year, m0 = date.today().year, date.today().month - 1
+    results["helper_sum_next"] = _timeit(lambda: [s.sum_next(year, m0, 3) for s in schedules], repeat=3)
+    results["helper_sum_next_many"] = _timeit(lambda: [s.sum_next_many(year, m0, (24, 36, 48, 60)) for s in schedules], repeat=3)
+    results["helper_annual_totals"] = _timeit(lambda: [s.annual_totals(range(year, year + 20)) for s in schedules], repeat=3)
+    results["helper_premiums_to_le"] = _timeit(lambda: [s.premiums_to_le(year, m0, 120) for s in schedules], repeat=3)
+    return results
+
+
+def peak_memory(policies: List[Dict]) -> Dict[str, float]:
+    """Peak traced allocation (bytes) while rendering each template for every policy (warm cache)."""
+    out: Dict[str, float] = {}
+    for kind, make in (
+        ("purchase", lambda p, s: tg.build_return_workbook(
+            p["insured_name"], p["carrier"], p["death_benefit"], p["investment"],
+            purchase_figures(p["dob"], p["le_months"], p["le_report_date"], p["death_benefit"], p["investment"], s))),
+        ("resale", lambda p, s: tg.build_resale_workbook(
+            p["insured_name"], p["carrier"],
+            resale_figures(p["dob"], p["le_months"], p["le_report_date"], p["death_benefit"], p["investment"], s))),
+    ):
+        make(policies[0], _parse(policies[0]))  # warm the template cache outside the trace
+        tracemalloc.start()
+        for p in policies:
+            tg.workbook_bytes(make(p, _parse(p)))
+        out[f"{kind}_peak_bytes"] = float(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return out
+
+
+# === baselines ===
+def load_baseline(path: str) -> Optional[Dict[str, float]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["results"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_baseline(path: str, results: Dict[str, float], policies: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"policies": policies, "saved": date.today().isoformat(), "results": results}, f, indent=2, sort_keys=True)
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Names of results that regressed by more than `threshold` (higher is worse, except *_per_s)."""
+    regressions = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        if not base or (not name.endswith(("_per_s", "_bytes")) and max(base, value) < NOISE_FLOOR_S):
+            continue
+        ratio = base / value if name.endswith("_per_s") else value / base
+        if ratio > 1.0 + threshold:
+            regressions.append(name)
+    return regressions
+
+
+def _format(name: str, value: float) -> str:
+    if name.endswith("_per_s"):
+        return f"{value:10.1f} policies/s"
+    if name.endswith("_bytes"):
+        return f"{value / 2**20:10.2f} MiB"
+    return f"{value * 1000:10.2f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stale-rows", type=int, default=5000, help="0 skips the template reset benchmark")
+    parser.add_argument("--legacy-rows", type=int, default=300, help="0 skips the old delete loop")
+    parser.add_argument("--policies", type=int, default=200, help="Synthetic policies for the generation benchmark (0 skips it)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    os.chdir(Path(__file__).resolve().parent)
+    results: Dict[str, float] = {}
+    if args.stale_rows:
+        results.update(bench_reset_stale_rows(args.stale_rows, args.legacy_rows))
+    if args.policies:
+        policies = synthetic_policies(args.policies, args.seed)
+        results.update(bench_generation(policies))
+        results.update(peak_memory(policies))
+
+    baseline = load_baseline(args.baseline)
+    regressions = set(compare(results, baseline, args.threshold)) if baseline else set()
+    for name, value in results.items():
+        note = ""
+        if baseline and baseline.get(name):
+            note = f"  (baseline {_format(name, baseline[name]).strip()})"
+            if name in regressions:
+                note += "  REGRESSION"
+        print(f"{name:<32} {_format(name, value)}{note}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, args.policies)
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        raise SystemExit(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Headless entry point: generate templates or figures from policy JSON without the
+Streamlit apps (no streamlit / gspread / oauth2client imports; openpyxl is only
+loaded when a workbook is actually rendered).
+
+    python cli.py purchase < policy.json > purchase.xlsx
+    python cli.py resale --sensitivity -o resale.xlsx < policy.json
+    python cli.py figures purchase < policy.json          # JSON, no openpyxl
+    python cli.py serve --port 8765                        # POST /purchase, /resale, /figures/<kind>
+
+Policy JSON: insured_name, dob, carrier, le_months, le_report_date, death_benefit,
+investment (or internal_cost), and premiums as `monthly_premiums` ({year: [..]})
+or `premiums_json` (a stored sheet cell, v1 or JSON). Optional `as_of` (YYYY-MM-DD).
+"""
+import argparse
+import json
+import sys
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+KINDS = ("purchase", "resale")
+REQUIRED_FIELDS = ("dob", "le_months", "le_report_date", "death_benefit")
+
+
+def parse_policy(payload: Dict) -> Tuple[Dict, float, Optional[date]]:
+    """(policy dict for PricingCache, client cost, as_of) from request JSON; ValueError if incomplete."""
+    from premium_codec import decode_schedule
+
+    if not isinstance(payload, dict):
+        raise ValueError("policy JSON must be an object")
+    missing = [f for f in REQUIRED_FIELDS if payload.get(f) in (None, "")]
+    if missing:
+        raise ValueError(f"missing field(s): {', '.join(missing)}")
+    for f in ("dob", "le_report_date"):
+        try:
+            datetime.strptime(str(payload[f]), "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"{f} must be YYYY-MM-DD (got {payload[f]!r})") from None
+    premiums = payload.get("monthly_premiums", payload.get("premiums_json"))
+    investment = payload.get("investment", payload.get("internal_cost")) or 0.0
+    as_of = payload.get("as_of")
+    try:
+        as_of = datetime.strptime(as_of, "%Y-%m-%d").date() if as_of else None
+    except (TypeError, ValueError):
+        raise ValueError(f"as_of must be YYYY-MM-DD (got {as_of!r})") from None
+    policy = {
+        "insured_name": str(payload.get("insured_name", "")),
+        "dob": str(payload["dob"]),
+        "carrier": str(payload.get("carrier", "")),
+        "le_months": int(payload["le_months"]),
+        "le_report_date": str(payload["le_report_date"]),
+        "death_benefit": payload["death_benefit"],
+        "monthly_premiums": decode_schedule(premiums),
+    }
+    return policy, float(investment), as_of
+
+
+def compute_figures(kind: str, policy: Dict, investment: float, as_of: Optional[date] = None) -> Dict:
+    from pricing import purchase_figures, resale_figures
+
+    fn = {"purchase": purchase_figures, "resale": resale_figures}[kind]
+    return fn(policy["dob"], policy["le_months"], policy["le_report_date"], policy["death_benefit"],
+              investment, policy["monthly_premiums"], as_of=as_of)
+
+
+_cache = None
+
+def render(kind: str, policy: Dict, investment: float, as_of: Optional[date] = None,
+           sensitivity: bool = False, simulate_paths: int = 0) -> bytes:
+    """xlsx bytes, through a process-wide PricingCache so a long-running service reuses results."""
+    global _cache
+    if _cache is None:
+        from pricing_cache import PricingCache
+        _cache = PricingCache(max_entries=256)
+    _, data = _cache.template(kind, policy, investment, as_of, sensitivity=sensitivity, simulate_paths=simulate_paths)
+    return data
+
+
+def _json_default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    if hasattr(o, "item"):        # numpy scalars
+        return o.item()
+    if hasattr(o, "tolist"):      # numpy arrays
+        return o.tolist()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+def dumps_figures(figures: Dict) -> bytes:
+    return json.dumps(figures, default=_json_default).encode("utf-8")
+
+
+# === HTTP service ===
+def make_server(host: str = "127.0.0.1", port: int = 8765):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so callers can loop over one connection
+        disable_nagle_algorithm = True  # headers and body are separate writes
+
+        def log_message(self, fmt, *args):
+            sys.stderr.write("%s - %s\n" % (self.address_string(), fmt % args))
+
+        def _reply(self, status: int, body: bytes, content_type: str, headers: Optional[Dict] = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status: int, message: str) -> None:
+            self._reply(status, json.dumps({"error": message}).encode("utf-8"), "application/json")
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/health":
+                return self._reply(200, b'{"ok": true}', "application/json")
+            self._error(404, "not found")
+
+        def _read_body(self) -> Optional[bytes]:
+            # Always consume the body, even for an error reply: on a kept-alive connection
+            # unread bytes would be parsed as the next request. None (and the connection
+            # is closed after the reply) when Content-Length is unusable.
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self.close_connection = True
+                return None
+            return self.rfile.read(length)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            if len(parts) == 2 and parts[0] == "figures" and parts[1] in KINDS:
+                kind, as_figures = parts[1], True
+            elif len(parts) == 1 and parts[0] in KINDS:
+                kind, as_figures = parts[0], False
+            else:
+                self._read_body()
+                return self._error(404, "POST /purchase, /resale or /figures/<kind>")
+            query = parse_qs(url.query)
+            body = self._read_body()
+            if body is None:
+                return self._error(400, "invalid Content-Length")
+            try:
+                policy, investment, as_of = parse_policy(json.loads(body or b"{}"))
+                if as_figures:
+                    return self._reply(200, dumps_figures(compute_figures(kind, policy, investment, as_of)), "application/json")
+                data = render(
+                    kind, policy, investment, as_of,
+                    sensitivity=query.get("sensitivity", ["0"])[0] in ("1", "true"),
+                    simulate_paths=int(query.get("simulate_paths", ["0"])[0]),
+                )
+            except (ValueError, KeyError, TypeError) as e:
+                return self._error(400, f"{type(e).__name__}: {e}")
+            except Exception as e:
+                return self._error(500, f"{type(e).__name__}: {e}")
+            filename = f"{kind}_template_{policy['insured_name'].lower().replace(' ', '_') or 'policy'}.xlsx"
+            self._reply(200, data, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        {"Content-Disposition": f'attachment; filename="{filename}"'})
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for kind in KINDS:
+        p = sub.add_parser(kind, help=f"Render the {kind} template from policy JSON on stdin")
+        p.add_argument("-o", "--output", help="Write the workbook here (default: stdout)")
+        p.add_argument("--as-of", help="Valuation date YYYY-MM-DD (overrides the JSON)")
+        if kind == "purchase":
+            p.add_argument("--simulate-paths", type=int, default=0, help="Add the Monte Carlo mortality sheet")
+        else:
+            p.add_argument("--sensitivity", action="store_true", help="Add the resale sensitivity grid sheets")
+    p = sub.add_parser("figures", help="Print the template figures as JSON (no workbook)")
+    p.add_argument("kind", choices=KINDS)
+    p.add_argument("--as-of", help="Valuation date YYYY-MM-DD (overrides the JSON)")
+    p = sub.add_parser("serve", help="Run the local HTTP service")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = make_server(args.host, args.port)
+        print(f"Serving on http://{args.host}:{server.server_port}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        payload = json.load(sys.stdin)
+        if args.as_of and isinstance(payload, dict):
+            payload["as_of"] = args.as_of
+        policy, investment, as_of = parse_policy(payload)
+    except (ValueError, KeyError, TypeError) as e:  # same as the HTTP handler's 400s
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    if args.command == "figures":
+        sys.stdout.buffer.write(dumps_figures(compute_figures(args.kind, policy, investment, as_of)) + b"\n")
+        return 0
+
+    data = render(
+        args.command, policy, investment, as_of,
+        sensitivity=getattr(args, "sensitivity", False),
+        simulate_paths=getattr(args, "simulate_paths", 0),
+    )
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(data)
+        print(f"✅ {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.buffer.write(data)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
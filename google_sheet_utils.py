@@ -1,10 +1,145 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
 import gspread
 import streamlit as st
 from oauth2client.service_account import ServiceAccountCredentials
 
-def get_sheet():
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = st.secrets["gcp_service_account"]
-    credentials = ServiceAccountCredentials.from_json_keyfile_dict(creds, scope)
-    client = gspread.authorize(credentials)
-    return client.open_by_key("145Q3_H3kMlOP3sW7d6MR4fVzbRegNsEJ0WJmNjhJOcA").sheet1
+from instrumentation import span
+
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+SPREADSHEET_KEY = "145Q3_H3kMlOP3sW7d6MR4fVzbRegNsEJ0WJmNjhJOcA"
+
+logger = logging.getLogger(__name__)
+
+# Process-wide client state: authorize once, reuse the HTTP session and worksheet handles
+_lock = threading.RLock()
+_credentials = None
+_client = None
+_spreadsheet = None
+_worksheets: Dict[str, object] = {}  # title -> gspread worksheet
+_handles: Dict[str, "TimedWorksheet"] = {}
+
+# name -> {"calls", "total_s", "max_s", "last_s"}
+_timings: Dict[str, Dict[str, float]] = {}
+
+
+@contextmanager
+def timed(name: str):
+    """Record wall time for one auth / API step under `name`."""
+    t0 = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        dt = time.perf_counter() - t0
+        with _lock:
+            s = _timings.setdefault(name, {"calls": 0, "total_s": 0.0, "max_s": 0.0, "last_s": 0.0})
+            s["calls"] += 1
+            s["total_s"] += dt
+            s["max_s"] = max(s["max_s"], dt)
+            s["last_s"] = dt
+        logger.debug("sheets %s took %.1f ms", name, dt * 1000)
+
+
+def call_timings() -> Dict[str, Dict[str, float]]:
+    """Snapshot of the recorded timings; `auth.*` entries are auth, `sheet.*` are data calls."""
+    with _lock:
+        return {k: dict(v) for k, v in _timings.items()}
+
+
+def reset_timings() -> None:
+    with _lock:
+        _timings.clear()
+
+
+def get_client() -> gspread.Client:
+    """
+    The process-wide gspread client, authorized once. gspread wraps the credentials
+    in a google-auth AuthorizedSession, which refreshes the access token itself
+    when it expires, so the client, spreadsheet and worksheet handles are kept.
+    """
+    global _credentials, _client
+    with _lock:
+        if _credentials is None:
+            with timed("auth.credentials"):
+                _credentials = ServiceAccountCredentials.from_json_keyfile_dict(st.secrets["gcp_service_account"], SCOPE)
+        if _client is None:
+            with timed("auth.authorize"):
+                _client = gspread.authorize(_credentials)
+        return _client
+
+
+def access_token() -> str:
+    """
+    OAuth access token for direct REST calls (async_sheets), taken from the same
+    google-auth credentials the gspread session uses; refreshed here when stale.
+    """
+    client = get_client()
+    with _lock:
+        credentials = client.http_client.auth
+        if not credentials.valid:
+            from google.auth.transport.requests import Request
+            with timed("auth.refresh"):
+                credentials.refresh(Request())
+        return credentials.token
+
+
+def get_spreadsheet():
+    global _spreadsheet
+    client = get_client()
+    with _lock:
+        if _spreadsheet is None:
+            with timed("auth.open_by_key"):
+                _spreadsheet = client.open_by_key(SPREADSHEET_KEY)
+        return _spreadsheet
+
+
+def _raw_worksheet(title: str):
+    spreadsheet = get_spreadsheet()
+    with _lock:
+        ws = _worksheets.get(title)
+        if ws is None:
+            with timed("auth.worksheet"):
+                ws = _worksheets[title] = spreadsheet.worksheet(title) if title else spreadsheet.sheet1
+        return ws
+
+
+class TimedWorksheet:
+    """
+    Long-lived worksheet handle. Method calls are forwarded to the cached gspread
+    worksheet and timed as `sheet.<method>`.
+    """
+
+    def __init__(self, title: str):
+        self._title = title
+
+    def __getattr__(self, name):
+        attr = getattr(_raw_worksheet(self._title), name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            worksheet = _raw_worksheet(self._title)
+            with timed(f"sheet.{name}"):
+                return getattr(worksheet, name)(*args, **kwargs)
+
+        return call
+
+
+def get_worksheet(title: str = None) -> TimedWorksheet:
+    """Cached handle for a worksheet by title (default: the first sheet)."""
+    key = title or ""
+    with _lock:
+        handle = _handles.get(key)
+        if handle is None:
+            handle = _handles[key] = TimedWorksheet(key)
+    _raw_worksheet(key)  # authorize and open up front, like the old get_sheet()
+    return handle
+
+
+def get_sheet() -> TimedWorksheet:
+    return get_worksheet()
@@ -0,0 +1,148 @@
+"""
+Lightweight spans around the hot paths (Sheets fetch, premium decoding, template
+load/reset, styling, save).
+
+Spans are off by default and then cost one flag check plus a ContextVar lookup.
+They are recorded when either
+  - tracing is enabled process-wide (TEMPLATE_TRACE=1 or enable()); each finished
+    span is then also logged as one JSON line, to TEMPLATE_TRACE_FILE if set and
+    to stderr otherwise, or
+  - the code runs inside `collect()`, which gathers the spans of one request for
+    an in-app timing panel without turning on logging.
+
+    with span("template.save", kind="purchase"):
+        wb.save(path)
+"""
+import functools
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+ENV_VAR = "TEMPLATE_TRACE"
+ENV_FILE = "TEMPLATE_TRACE_FILE"
+
+logger = logging.getLogger("instrumentation")
+
+_enabled = False
+_collector: ContextVar[Optional[List[Dict]]] = ContextVar("span_collector", default=None)
+_parent: ContextVar[Optional[str]] = ContextVar("span_parent", default=None)
+_NULL_SPAN = nullcontext()
+
+
+def enable(log_path: Optional[str] = None) -> None:
+    """Turn on process-wide tracing; `log_path` appends the JSON lines to a file."""
+    global _enabled
+    _enabled = True
+    if log_path or not logger.handlers:
+        handler = logging.FileHandler(log_path, encoding="utf-8") if log_path else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class _Span:
+    __slots__ = ("name", "fields", "_t0", "_wall", "_token")
+
+    def __init__(self, name: str, fields: Dict):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self) -> "_Span":
+        self._token = _parent.set(self.name)
+        self._wall = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        ms = (time.perf_counter() - self._t0) * 1000.0
+        _parent.reset(self._token)
+        record = {"span": self.name, "ms": round(ms, 3), "start": round(self._wall, 6), "parent": _parent.get()}
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        if self.fields:
+            record.update(self.fields)
+        spans = _collector.get()
+        if spans is not None:
+            spans.append(record)
+        if _enabled:
+            logger.info(json.dumps(record, default=str))
+
+
+def span(name: str, **fields):
+    """Context manager timing one stage; a shared no-op when nothing is recording."""
+    if not _enabled and _collector.get() is None:
+        return _NULL_SPAN
+    return _Span(name, fields)
+
+
+def traced(name: str):
+    """Decorator form of `span` for a whole function."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _enabled and _collector.get() is None:
+                return fn(*args, **kwargs)
+            with _Span(name, {}):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+@contextmanager
+def collect():
+    """Gather every span finished inside the block (in finish order) into the yielded list."""
+    spans: List[Dict] = []
+    token = _collector.set(spans)
+    try:
+        yield spans
+    finally:
+        _collector.reset(token)
+
+
+def collect_run(active: bool = True) -> Optional[List[Dict]]:
+    """
+    Collect spans for the rest of the current context, e.g. one Streamlit script
+    run (each rerun starts over); returns the list being filled. active=False stops
+    collecting and returns None.
+    """
+    spans: Optional[List[Dict]] = [] if active else None
+    _collector.set(spans)
+    return spans
+
+
+def summarize(spans: List[Dict]) -> List[Dict]:
+    """Per span name: calls, total and max ms, in order of first appearance."""
+    out: Dict[str, Dict] = {}
+    for s in spans:
+        row = out.setdefault(s["span"], {"span": s["span"], "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+        row["calls"] += 1
+        row["total_ms"] = round(row["total_ms"] + s["ms"], 3)
+        row["max_ms"] = max(row["max_ms"], s["ms"])
+    return list(out.values())
+
+
+def timing_panel(spans: List[Dict], title: str = "⏱️ Timings") -> None:
+    """Render a summary of `spans` in a Streamlit expander."""
+    import streamlit as st
+    with st.expander(title, expanded=True):
+        if not spans:
+            st.caption("No instrumented work ran in this run (cached results are not re-timed).")
+            return
+        st.dataframe(summarize(spans))
+
+
+if os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes", "on"):
+    enable(os.environ.get(ENV_FILE))
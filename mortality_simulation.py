@@ -0,0 +1,185 @@
+"""
+Monte Carlo valuation of the purchase template against a mortality curve.
+
+Instead of a single deterministic maturity at LE, maturity months are drawn from a
+Gompertz survival curve calibrated so that the median remaining lifetime equals the
+remaining LE (life-expectancy reports quote LE as the 50% mortality point). Premiums
+are accumulated through the drawn month with the policy's PremiumSchedule.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from premium_schedule import NumberLike, PremiumSchedule, _clean_to_float
+from pricing import _age_today, _elapsed_remaining_le
+
+GOMPERTZ_SLOPE = 0.085       # annual growth rate of the force of mortality at older ages
+MAX_AGE = 120                # survivors are matured here
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+
+def gompertz_hazard_now(remaining_le_months, slope: float = GOMPERTZ_SLOPE) -> np.ndarray:
+    """
+    Current force of mortality (per year) that makes the median remaining lifetime
+    equal `remaining_le_months`; vectorized over an array of LEs. An exhausted LE is
+    treated as one month.
+    """
+    le_years = np.maximum(np.asarray(remaining_le_months, dtype=np.int64), 1) / 12.0
+    return slope * np.log(2.0) / np.expm1(slope * le_years)
+
+
+def max_maturity_months(age) -> np.ndarray:
+    """Months until MAX_AGE (at least one), where survivors are matured; vectorized over ages."""
+    return np.maximum((MAX_AGE - np.asarray(age, dtype=np.int64)) * 12, 1)
+
+
+def gompertz_params(age: float, remaining_le_months: int, slope: float = GOMPERTZ_SLOPE) -> Dict[str, float]:
+    """
+    Gompertz force of mortality mu(x) = alpha * exp(slope * x), with alpha solved so
+    the median remaining lifetime from `age` equals `remaining_le_months`.
+    `hazard_now` is mu(age) (per year). An exhausted LE is treated as one month.
+    """
+    hazard_now = float(gompertz_hazard_now(remaining_le_months, slope))
+    return {"alpha": float(hazard_now * np.exp(-slope * age)), "slope": slope, "hazard_now": hazard_now}
+
+
+def survival_curve(hazard_now: float, slope: float, months: np.ndarray) -> np.ndarray:
+    """S(t) at month offsets t from today."""
+    t = np.asarray(months, dtype=np.float64) / 12.0
+    return np.exp(-(hazard_now / slope) * np.expm1(slope * t))
+
+
+def survival_matrix(remaining_le_months, ages, n_months: int, slope: float = GOMPERTZ_SLOPE) -> np.ndarray:
+    """
+    S(t) at month offsets 0..n_months for many policies at once, shape (policies,
+    n_months + 1): the same curve and MAX_AGE cap simulate_policy draws from, so
+    survival is zero from the month a policy would be matured at MAX_AGE.
+    """
+    hazard = gompertz_hazard_now(remaining_le_months, slope)
+    months = np.arange(n_months + 1)
+    survival = survival_curve(hazard[:, None], slope, months)
+    survival[months[None, :] >= max_maturity_months(ages)[:, None]] = 0.0
+    return survival
+
+
+def draw_maturity_months(hazard_now: float, slope: float, n_paths: int, max_months: int, rng: np.random.Generator) -> np.ndarray:
+    """Month index (0 = this month) of death for each path, by inverting S(t)."""
+    e = rng.standard_exponential(n_paths)             # -ln(U)
+    t_years = np.log1p(slope * e / hazard_now) / slope
+    return np.minimum((t_years * 12.0).astype(np.int64), max_months - 1)
+
+
+def _monthly_irr(cash_flows: np.ndarray) -> float:
+    """IRR (annualized) of monthly cash flows at t = 0, 1, 2, ... by bisection."""
+    t = np.arange(len(cash_flows))
+    def npv(r):
+        return float(np.sum(cash_flows / (1.0 + r) ** t))
+    lo, hi = -0.5, 1.0  # monthly rates
+    if npv(lo) * npv(hi) > 0:
+        return float("nan")
+    for _ in range(100):
+        mid = (lo + hi) / 2.0
+        if npv(lo) * npv(mid) <= 0:
+            hi = mid
+        else:
+            lo = mid
+    return (1.0 + (lo + hi) / 2.0) ** 12 - 1.0
+
+
+def simulate_policy(
+    dob: str,
+    le_months: int,
+    le_report_date: str,
+    death_benefit: NumberLike,
+    investment: NumberLike,
+    monthly_premiums: Union[Dict, PremiumSchedule],
+    n_paths: int = 100_000,
+    slope: float = GOMPERTZ_SLOPE,
+    seed: Optional[int] = None,
+    as_of: Optional[date] = None,
+) -> Dict:
+    """
+    Simulate `n_paths` maturities and report the distribution of profit and return.
+
+    Per path: premiums paid = this month through the death month; profit = DB - cost
+    - premiums; total return = profit / (cost + premiums); annualized = total return /
+    years held (the purchase template's convention). `expected_irr` is the IRR of the
+    expected monthly cash flows (premiums while alive, DB at death).
+    """
+    today = as_of or date.today()
+    elapsed, remaining_le_months, _ = _elapsed_remaining_le(int(le_months), le_report_date, today)
+    age = _age_today(dob, le_report_date, elapsed)
+    schedule = PremiumSchedule.coerce(monthly_premiums)
+    DB = _clean_to_float(death_benefit)
+    COST0 = _clean_to_float(investment)
+
+    params = gompertz_params(age, remaining_le_months, slope)
+    max_months = int(max_maturity_months(age))
+    rng = np.random.default_rng(seed)
+    death_month = draw_maturity_months(params["hazard_now"], slope, n_paths, max_months, rng)
+
+    # Premiums through the death month: one prefix-sum lookup per path
+    paid = schedule.sum_next_many(today.year, today.month - 1, death_month + 1)
+    total_cost = COST0 + paid
+    profit = DB - total_cost
+    total_return = np.divide(profit, total_cost, out=np.zeros_like(profit), where=total_cost > 0)
+    years_held = (death_month + 1) / 12.0
+    annualized = total_return / years_held
+
+    # Expected cash flows by month (same timing as the template: premium at the start, DB at the end)
+    horizon = int(death_month.max()) + 1
+    deaths = np.bincount(death_month, minlength=horizon) / n_paths
+    alive_at_start = 1.0 - np.concatenate(([0.0], np.cumsum(deaths)[:-1]))
+    premiums = schedule.sum_next_many(today.year, today.month - 1, np.arange(1, horizon + 1))
+    premiums = np.diff(premiums, prepend=0.0)
+    cash_flows = np.zeros(horizon + 1)
+    cash_flows[0] -= COST0
+    cash_flows[:-1] -= premiums * alive_at_start
+    cash_flows[1:] += DB * deaths
+
+    def pct(x):
+        return {p: float(v) for p, v in zip(PERCENTILES, np.percentile(x, PERCENTILES))}
+
+    return {
+        "as_of": today,
+        "n_paths": n_paths,
+        "age": age,
+        "remaining_le_months": remaining_le_months,
+        "gompertz": params,
+        "maturity_months": {**pct(death_month + 1), "mean": float(np.mean(death_month + 1))},
+        "prob_mature_by_le": float(np.mean(death_month + 1 <= remaining_le_months)),
+        "prob_loss": float(np.mean(profit < 0)),
+        "profit": {**pct(profit), "mean": float(np.mean(profit))},
+        "total_return": {**pct(total_return), "mean": float(np.mean(total_return))},
+        "annualized_return": {**pct(annualized), "mean": float(np.mean(annualized))},
+        "expected_irr": _monthly_irr(cash_flows),
+    }
+
+
+_POLICY_FIELDS = ("dob", "le_months", "le_report_date", "death_benefit", "investment", "monthly_premiums", "as_of")
+
+def _simulate_one(kwargs: Dict) -> Dict:
+    return simulate_policy(**kwargs)
+
+
+def simulate_portfolio(
+    policies: Iterable[Dict],
+    n_paths: int = 100_000,
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> List[Dict]:
+    """
+    simulate_policy for many policies (dicts of its keyword arguments) across a
+    process pool; results come back in input order. Each policy gets its own seed
+    derived from `seed`, so runs are reproducible.
+    """
+    policies = list(policies)
+    seeds = np.random.SeedSequence(seed).generate_state(len(policies)) if policies else []
+    jobs = [
+        {**{k: p[k] for k in _POLICY_FIELDS if k in p}, "n_paths": n_paths, "seed": int(s)}
+        for p, s in zip(policies, seeds)
+    ]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_simulate_one, jobs, chunksize=max(len(jobs) // 32, 1)))
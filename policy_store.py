@@ -0,0 +1,210 @@
+import csv
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from instrumentation import traced
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parent / "policy_store.sqlite"
+FULL_SYNC_INTERVAL_S = 600  # a plain sync() turns into a full hash sync at least this often
+
+
+def _row_hash(values: List) -> str:
+    return hashlib.sha1(json.dumps(values, default=str).encode("utf-8")).hexdigest()
+
+
+# === backends ===
+class SheetsBackend:
+    """The onboarding Google Sheet (first row = header), read through gspread."""
+
+    def __init__(self, sheet=None):
+        self._sheet = sheet
+
+    @property
+    def sheet(self):
+        if self._sheet is None:
+            from google_sheet_utils import get_sheet
+            self._sheet = get_sheet()
+        return self._sheet
+
+    def header(self) -> List[str]:
+        return self.sheet.row_values(1)
+
+    def row_count(self) -> int:
+        # Column A (insured_name) is filled for every saved policy
+        return max(len(self.sheet.col_values(1)) - 1, 0)
+
+    def fetch_rows(self, start: int, end: int) -> List[List]:
+        """Data rows [start, end) (0-based, header excluded), numericised like get_all_records."""
+        from gspread.utils import numericise_all, rowcol_to_a1
+        if end <= start:
+            return []
+        width = len(self.header())
+        rng = f"A{start + 2}:{rowcol_to_a1(end + 1, width)}"
+        rows = self.sheet.get(rng)
+        return [numericise_all(list(r) + [""] * (width - len(r)), default_blank="") for r in rows]
+
+
+class FileBackend:
+    """A local CSV (header row first) or JSON list-of-records file standing in for the sheet."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    def _load(self) -> List[List]:
+        if self.path.suffix.lower() == ".json":
+            records = json.loads(self.path.read_text(encoding="utf-8"))
+            header = list(records[0].keys()) if records else []
+            return [header] + [[r.get(h, "") for h in header] for r in records]
+        with self.path.open(newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        header = rows[0] if rows else []
+        return [header] + [_numericise(r) for r in rows[1:]]
+
+    def header(self) -> List[str]:
+        rows = self._load()
+        return rows[0] if rows else []
+
+    def row_count(self) -> int:
+        return max(len(self._load()) - 1, 0)
+
+    def fetch_rows(self, start: int, end: int) -> List[List]:
+        return self._load()[1:][start:end]
+
+
+def _numericise(row: List[str]) -> List:
+    out = []
+    for v in row:
+        try:
+            out.append(int(v))
+        except ValueError:
+            try:
+                out.append(float(v))
+            except ValueError:
+                out.append(v)
+    return out
+# === end backends ===
+
+
+class PolicyStore:
+    """
+    SQLite copy of the policy sheet, kept in sync incrementally.
+
+    sync() compares the backend's row count with the stored one and only fetches
+    the rows appended since the last sync; sync(full=True) re-reads everything and
+    rewrites just the rows whose content hash changed (edits, deletions). A row
+    count alone misses in-place edits, so once `full_sync_interval` seconds have
+    passed since the last full sync (recorded in the store, so it survives
+    restarts) a plain sync() runs a full one; None turns that off.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_STORE_PATH,
+        backend=None,
+        full_sync_interval: Optional[float] = FULL_SYNC_INTERVAL_S,
+        clock=time.time,
+    ):
+        self.backend = backend if backend is not None else SheetsBackend()
+        self.full_sync_interval = full_sync_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS policies (
+                row_idx INTEGER PRIMARY KEY,
+                insured_name TEXT,
+                record_json TEXT NOT NULL,
+                row_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+            """
+        )
+
+    def _header(self) -> List[str]:
+        row = self._db.execute("SELECT v FROM meta WHERE k = 'header'").fetchone()
+        return json.loads(row[0]) if row else []
+
+    def _full_sync_due(self) -> bool:
+        if self.full_sync_interval is None:
+            return False
+        row = self._db.execute("SELECT v FROM meta WHERE k = 'last_full_sync'").fetchone()
+        return row is None or self._clock() - float(row[0]) >= self.full_sync_interval
+
+    def _stored_count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM policies").fetchone()[0]
+
+    def _upsert(self, header: List[str], start: int, rows: List[List]) -> int:
+        changed = 0
+        for i, values in enumerate(rows, start=start):
+            h = _row_hash(values)
+            old = self._db.execute("SELECT row_hash FROM policies WHERE row_idx = ?", (i,)).fetchone()
+            if old and old[0] == h:
+                continue
+            record = dict(zip(header, values))
+            self._db.execute(
+                "INSERT OR REPLACE INTO policies (row_idx, insured_name, record_json, row_hash) VALUES (?, ?, ?, ?)",
+                (i, str(record.get("insured_name", "")), json.dumps(record, default=str), h),
+            )
+            changed += 1
+        return changed
+
+    @traced("store.sync")
+    def sync(self, full: bool = False) -> Dict[str, int]:
+        """
+        Bring the store up to date; returns {"rows": n, "fetched": n, "changed": n, "full": bool}.
+        Runs a full hash sync when asked, when rows were removed, or when one is due.
+        """
+        with self._lock, self._db:
+            full = full or self._full_sync_due()
+            header = self._header()
+            if full or not header:
+                header = self.backend.header()
+                self._db.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('header', ?)", (json.dumps(header),))
+
+            remote = self.backend.row_count()
+            stored = self._stored_count()
+            if full or remote < stored:
+                # Rows were edited or removed: hash-compare everything
+                rows = self.backend.fetch_rows(0, remote)
+                changed = self._upsert(header, 0, rows)
+                deleted = self._db.execute("DELETE FROM policies WHERE row_idx >= ?", (remote,)).rowcount
+                self._db.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('last_full_sync', ?)", (repr(self._clock()),))
+                return {"rows": remote, "fetched": len(rows), "changed": changed + deleted, "full": True}
+            if remote > stored:
+                rows = self.backend.fetch_rows(stored, remote)
+                return {"rows": remote, "fetched": len(rows), "changed": self._upsert(header, stored, rows), "full": False}
+            return {"rows": remote, "fetched": 0, "changed": 0, "full": False}
+
+    @traced("store.records")
+    def records(self) -> List[Dict]:
+        """Every stored row as a dict, in sheet order (same shape as get_all_records)."""
+        with self._lock:
+            rows = self._db.execute("SELECT record_json FROM policies ORDER BY row_idx").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def index(self) -> List[Tuple[int, str, str]]:
+        """(row_idx, insured_name, row_hash) for every row, in sheet order; no record decoding."""
+        with self._lock:
+            return self._db.execute("SELECT row_idx, insured_name, row_hash FROM policies ORDER BY row_idx").fetchall()
+
+    def record_at(self, row_idx: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT record_json FROM policies WHERE row_idx = ?", (row_idx,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, insured_name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT record_json FROM policies WHERE insured_name = ? ORDER BY row_idx DESC LIMIT 1",
+                (insured_name,),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,249 @@
+import csv
+import io
+import json
+import random
+import re
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, IO, List, Tuple, Union
+
+from instrumentation import traced
+from premium_checks import validate_premiums
+from premium_codec import decode_year_map, encode_premiums, is_encoded
+
+# Column order of the policy sheet (same order the onboarding form appends)
+SHEET_COLUMNS = [
+    "insured_name",
+    "dob",
+    "carrier",
+    "le_months",
+    "le_report_date",
+    "death_benefit",
+    "internal_cost",
+    "premiums_json",
+]
+REQUIRED_COLUMNS = ["insured_name", "dob", "carrier", "le_months", "le_report_date", "death_benefit"]
+
+_YEAR_COLUMN = re.compile(r"^\d{4}$")
+
+
+def split_premium_lines(text: str) -> Tuple[List[float], List[str]]:
+    """(premiums, lines that did not parse); one premium per line, dollar signs and commas are okay."""
+    cleaned_lines, rejected = [], []
+    for raw in str(text or "").strip().splitlines():
+        line = raw.strip().replace("$", "").replace(",", "")
+        if line:
+            try:
+                cleaned_lines.append(float(line))
+            except ValueError:
+                rejected.append(raw.strip())
+    return cleaned_lines, rejected
+
+
+def parse_premium_lines(text: str) -> List[float]:
+    """One premium per line; dollar signs and commas are okay, unparseable lines are skipped."""
+    return split_premium_lines(text)[0]
+
+
+def parse_premiums_checked(inputs_dict: Dict) -> Tuple[Dict, Dict]:
+    """Like parse_premiums, plus {year: [lines that did not parse]} for validate_premiums."""
+    premiums, rejected = {}, {}
+    for year, val in inputs_dict.items():
+        cleaned_lines, bad = split_premium_lines(val)
+        if cleaned_lines:
+            premiums[year] = cleaned_lines
+        if bad:
+            rejected[year] = bad
+    return premiums, rejected
+
+
+def parse_premiums(inputs_dict: Dict) -> Dict:
+    """{year: pasted text} -> {year: [floats]}; years with nothing parseable are dropped."""
+    return parse_premiums_checked(inputs_dict)[0]
+
+
+def policy_row(policy_inputs: Dict, premiums) -> List:
+    """
+    One sheet row in SHEET_COLUMNS order; premiums are stored v1-encoded (premium_codec).
+    `premiums` is a {year: [..]} map, a PremiumSchedule, or an already-encoded cell
+    (validate_premiums()["cell"]), which is stored unchanged.
+    """
+    return [
+        policy_inputs["insured_name"],
+        policy_inputs["dob"],
+        policy_inputs["carrier"],
+        policy_inputs["le_months"],
+        policy_inputs["le_report_date"],
+        policy_inputs["death_benefit"],
+        policy_inputs["internal_cost"],
+        premiums if is_encoded(premiums) else encode_premiums(premiums),
+    ]
+
+
+# === tape reading ===
+def _cell_text(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return v.date().isoformat()
+    if isinstance(v, date):
+        return v.isoformat()
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v).strip()
+
+
+@traced("tape.read")
+def read_tape(source: Union[str, Path, IO[bytes]], filename: str = None) -> List[Dict[str, str]]:
+    """
+    Read a CSV or XLSX policy tape into header -> text dicts (header names lower-cased).
+    `source` is a path or a binary file object (e.g. a Streamlit upload); the format
+    comes from `filename` or the path suffix.
+    """
+    name = filename or getattr(source, "name", None) or str(source)
+    if isinstance(source, (str, Path)):
+        data = Path(source).read_bytes()
+    else:
+        data = source.read()
+
+    if name.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+        wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        rows = [[_cell_text(v) for v in r] for r in wb.active.iter_rows(values_only=True)]
+        wb.close()
+    else:
+        rows = list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+
+    rows = [r for r in rows if any(c.strip() for c in r)]
+    if not rows:
+        return []
+    header = [h.strip().lower() for h in rows[0]]
+    return [dict(zip(header, r + [""] * (len(header) - len(r)))) for r in rows[1:]]
+
+
+def _tape_premiums(row: Dict[str, str]) -> Tuple[Dict[int, List[float]], Dict[int, List[str]]]:
+    # Either a premiums_json column, or one column per year holding the pasted premium text
+    # (one per line; ";" also separates entries so a tape can keep them on one line).
+    # Returns (premiums, {year: lines that did not parse}).
+    if row.get("premiums_json", "").strip():
+        text = row["premiums_json"].strip()
+        raw = decode_year_map(text) if is_encoded(text) else json.loads(text)
+        return parse_premiums_checked({int(y): "\n".join(map(str, v)) for y, v in raw.items()})
+    years = {int(k): v.replace(";", "\n") for k, v in row.items() if _YEAR_COLUMN.match(k)}
+    return parse_premiums_checked(dict(sorted(years.items())))
+
+
+def _parse_date(text: str) -> str:
+    return datetime.strptime(text.strip()[:10], "%Y-%m-%d").date().isoformat()
+
+
+@traced("tape.validate")
+def validate_tape(rows: List[Dict[str, str]]) -> Tuple[List[List], List[str], List[str]]:
+    """
+    Validate a whole tape before anything is written.
+    Returns (sheet_rows, errors, warnings); both name the tape line (header = line 1).
+    Premium problems come from premium_checks.validate_premiums: its errors block
+    the line, its warnings (gaps, spikes, LE coverage) are reported but saved.
+    """
+    sheet_rows: List[List] = []
+    errors: List[str] = []
+    warnings: List[str] = []
+    if rows:
+        missing = [c for c in REQUIRED_COLUMNS if c not in rows[0]]
+        if missing:
+            return [], [f"Missing column(s): {', '.join(missing)}"], []
+
+    seen: Dict[str, int] = {}
+    for line, row in enumerate(rows, start=2):
+        problems = []
+        name = row.get("insured_name", "").strip()
+        if not name:
+            problems.append("insured_name is empty")
+        elif name.lower() in seen:
+            problems.append(f"duplicate of line {seen[name.lower()]}")
+        else:
+            seen[name.lower()] = line
+
+        dates = {}
+        for col in ("dob", "le_report_date"):
+            try:
+                dates[col] = _parse_date(row.get(col, ""))
+            except ValueError:
+                problems.append(f"{col} must be YYYY-MM-DD (got {row.get(col)!r})")
+
+        numbers = {}
+        for col, cast, minimum in (("le_months", int, 1), ("death_benefit", float, None), ("internal_cost", float, 0.0)):
+            text = row.get(col, "").replace("$", "").replace(",", "").strip()
+            if not text and col == "internal_cost":
+                numbers[col] = 0.0
+                continue
+            try:
+                numbers[col] = cast(float(text)) if cast is int else cast(text)
+            except ValueError:
+                problems.append(f"{col} is not a number (got {row.get(col)!r})")
+                continue
+            if minimum is not None and numbers[col] < minimum:
+                problems.append(f"{col} must be at least {minimum}")
+
+        try:
+            premiums, rejected = _tape_premiums(row)
+            if not premiums:
+                problems.append("no premiums parsed")
+        except (ValueError, AttributeError, TypeError) as e:
+            premiums, rejected = {}, {}
+            problems.append(f"premiums could not be read ({e})")
+
+        report = None
+        if premiums and "le_months" in numbers and "le_report_date" in dates:
+            report = validate_premiums(premiums, numbers["le_months"], dates["le_report_date"], rejected=rejected)
+            problems.extend(report["errors"])
+            if report["warnings"]:
+                warnings.append(f"Line {line} ({name or 'unnamed'}): " + "; ".join(report["warnings"]))
+
+        if problems:
+            errors.append(f"Line {line} ({name or 'unnamed'}): " + "; ".join(problems))
+            continue
+        sheet_rows.append(policy_row(
+            {"insured_name": name, "carrier": row.get("carrier", "").strip(), **dates, **numbers},
+            report["cell"],
+        ))
+    return sheet_rows, errors, warnings
+# === end tape reading ===
+
+
+def _is_retryable(e: Exception) -> bool:
+    # Only rate limiting: a 429 append was not applied. A 5xx append may already have
+    # been written, and resending the chunk would duplicate up to chunk_size policies.
+    response = getattr(e, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+@traced("tape.append")
+def append_policy_rows(
+    sheet,
+    rows: List[List],
+    chunk_size: int = 200,
+    max_retries: int = 6,
+    base_delay: float = 1.0,
+    sleep=time.sleep,
+) -> int:
+    """
+    Append rows with one `append_rows` call per chunk. Rate-limit (429) errors are
+    retried with exponential backoff plus jitter; anything else, 5xx included (the
+    chunk may have been written), raises.
+    Returns the number of rows written.
+    """
+    written = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        for attempt in range(max_retries + 1):
+            try:
+                sheet.append_rows(chunk, value_input_option="RAW")
+                break
+            except Exception as e:
+                if attempt == max_retries or not _is_retryable(e):
+                    raise
+                sleep(base_delay * (2 ** attempt) + random.uniform(0, base_delay))
+        written += len(chunk)
+    return written
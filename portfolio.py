@@ -0,0 +1,207 @@
+"""
+Portfolio projection across every stored policy.
+
+All premium schedules are laid out in one policies x months matrix starting at the
+valuation month; survival is mortality_simulation.survival_matrix (the LE-calibrated
+Gompertz curve and MAX_AGE cap that simulate_policy draws from) for the whole book
+at once. From there the monthly premium outlay, expected death-benefit inflows and
+the capital the book needs are plain column sums.
+"""
+import argparse
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from batch_generate import policy_from_record
+from mortality_simulation import GOMPERTZ_SLOPE, survival_matrix
+from premium_schedule import PremiumSchedule, _clean_to_float
+from pricing import _age_today, _elapsed_remaining_le
+
+MONTHS_PAST_LE = 36
+MAX_HORIZON_MONTHS = 600
+
+
+def load_portfolio_records() -> List[Dict]:
+    """The records the selection app reads (local policy store, synced from the sheet)."""
+    from policy_store import PolicyStore, SheetsBackend
+    store = PolicyStore(backend=SheetsBackend())
+    store.sync()
+    return store.records()
+
+
+def project_portfolio(
+    records: Iterable[Dict],
+    as_of: Optional[date] = None,
+    horizon_months: Optional[int] = None,
+    slope: float = GOMPERTZ_SLOPE,
+) -> Dict:
+    """
+    Project the book month by month from `as_of` (default today).
+
+    Returns per-policy vectors (`names`, `ages`, `death_benefit`, `remaining_le_months`,
+    `prob_mature_12m`, `policy_expected_premiums` over the horizon), the `premiums` matrix (policies x months), the `survival` matrix (probability
+    alive at the start of each month), monthly book totals (`scheduled_premiums`,
+    `expected_premiums`, `expected_db_inflows`, `expected_net`, `cumulative_net`),
+    the `capital_requirement` (deepest point of cumulative expected net cash flow)
+    and its month, plus `skipped` records that could not be read.
+    """
+    today = as_of or date.today()
+    names: List[str] = []
+    schedules: List[PremiumSchedule] = []
+    dbs: List[float] = []
+    rem_le: List[int] = []
+    ages: List[int] = []
+    skipped: List[Dict] = []
+    for row in records:
+        try:
+            p = policy_from_record(row)
+            elapsed, rem, _ = _elapsed_remaining_le(p["le_months"], p["le_report_date"], today)
+            age = _age_today(p["dob"], p["le_report_date"], elapsed)
+            schedule = PremiumSchedule.coerce(p["monthly_premiums"])
+        except Exception as e:
+            skipped.append({"insured_name": row.get("insured_name"), "error": f"{type(e).__name__}: {e}"})
+            continue
+        names.append(p["insured_name"])
+        schedules.append(schedule)
+        dbs.append(_clean_to_float(p["death_benefit"]))
+        rem_le.append(rem)
+        ages.append(age)
+
+    n = len(names)
+    rem_le_arr = np.asarray(rem_le, dtype=np.int64)
+    db = np.asarray(dbs, dtype=np.float64)
+    if horizon_months is None:
+        horizon_months = int(rem_le_arr.max()) + MONTHS_PAST_LE if n else MONTHS_PAST_LE
+    horizon = max(min(int(horizon_months), MAX_HORIZON_MONTHS), 1)
+
+    # Policies x months premium matrix, aligned so column 0 is the valuation month
+    premiums = np.zeros((n, horizon), dtype=np.float64)
+    for i, s in enumerate(schedules):
+        start = s.index(today.year, today.month - 1)
+        lo, hi = max(start, 0), min(start + horizon, len(s.monthly))
+        if hi > lo:
+            premiums[i, lo - start:hi - start] = s.monthly[lo:hi]
+
+    # Survival for every policy at once: median remaining life = remaining LE, matured at MAX_AGE
+    ages_arr = np.asarray(ages, dtype=np.int64)
+    survival = survival_matrix(rem_le_arr, ages_arr, horizon, slope)  # (n, horizon + 1)
+    deaths = survival[:, :-1] - survival[:, 1:]
+    expected_by_policy = premiums * survival[:, :-1]
+
+    scheduled = premiums.sum(axis=0)
+    expected_premiums = expected_by_policy.sum(axis=0)
+    expected_db = db @ deaths if n else np.zeros(horizon)
+    expected_net = expected_db - expected_premiums
+    cumulative = np.cumsum(expected_net)
+    trough = int(np.argmin(cumulative))
+
+    return {
+        "as_of": today,
+        "names": names,
+        "ages": ages_arr,
+        "death_benefit": db,
+        "remaining_le_months": rem_le_arr,
+        "prob_mature_12m": 1.0 - survival[:, min(12, horizon)],
+        "policy_expected_premiums": expected_by_policy.sum(axis=1),
+        "months": np.arange(horizon),
+        "premiums": premiums,
+        "survival": survival[:, :-1],
+        "scheduled_premiums": scheduled,
+        "expected_premiums": expected_premiums,
+        "expected_db_inflows": expected_db,
+        "expected_net": expected_net,
+        "cumulative_net": cumulative,
+        "capital_requirement": float(max(-cumulative[trough], 0.0)),
+        "capital_peak_month": trough,
+        "skipped": skipped,
+    }
+
+
+def _month_label(as_of: date, offset: int) -> str:
+    y, m = divmod(as_of.year * 12 + as_of.month - 1 + offset, 12)
+    return f"{y}-{m + 1:02d}"
+
+
+def export_portfolio_workbook(projection: Dict, output_filename: str) -> str:
+    """Write Summary / Monthly Projection / Policies sheets to one workbook (streamed)."""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+    from template_generator import CURRENCY_FORMAT, PERCENT_FORMAT, styled_cell
+
+    wb = Workbook(write_only=True)
+    bold = Font(bold=True)
+    p = projection
+
+    ws = wb.create_sheet("Summary")
+    ws.column_dimensions["A"].width = 40
+    ws.column_dimensions["B"].width = 22
+    for label, value, fmt in (
+        ("VALUED AS OF", p["as_of"].strftime("%Y-%m-%d"), None),
+        ("POLICIES", len(p["names"]), "0"),
+        ("TOTAL DEATH BENEFIT", float(p["death_benefit"].sum()), CURRENCY_FORMAT),
+        ("SCHEDULED PREMIUMS (HORIZON)", float(p["scheduled_premiums"].sum()), CURRENCY_FORMAT),
+        ("EXPECTED PREMIUMS (HORIZON)", float(p["expected_premiums"].sum()), CURRENCY_FORMAT),
+        ("EXPECTED DEATH BENEFITS (HORIZON)", float(p["expected_db_inflows"].sum()), CURRENCY_FORMAT),
+        ("CAPITAL REQUIREMENT", p["capital_requirement"], CURRENCY_FORMAT),
+        ("CAPITAL PEAK MONTH", _month_label(p["as_of"], p["capital_peak_month"]), None),
+        ("SKIPPED RECORDS", len(p["skipped"]), "0"),
+    ):
+        ws.append([styled_cell(ws, label, font=bold), styled_cell(ws, value, number_format=fmt)])
+
+    ws = wb.create_sheet("Monthly Projection")
+    for col in "ABCDEFG":
+        ws.column_dimensions[col].width = 24
+    ws.append([styled_cell(ws, h, font=bold) for h in (
+        "MONTH", "SCHEDULED PREMIUMS", "EXPECTED PREMIUMS", "EXPECTED DEATH BENEFITS",
+        "EXPECTED NET CASH FLOW", "CUMULATIVE NET", "EXPECTED POLICIES IN FORCE",
+    )])
+    in_force = p["survival"].sum(axis=0)
+    columns = [p["scheduled_premiums"], p["expected_premiums"], p["expected_db_inflows"], p["expected_net"], p["cumulative_net"]]
+    for m in range(len(p["months"])):
+        ws.append([_month_label(p["as_of"], m)]
+                  + [styled_cell(ws, float(c[m]), number_format=CURRENCY_FORMAT) for c in columns]
+                  + [styled_cell(ws, float(in_force[m]), number_format="0.00")])
+
+    ws = wb.create_sheet("Policies")
+    for col, width in (("A", 30), ("B", 10), ("C", 20), ("D", 22), ("E", 24), ("F", 28), ("G", 30)):
+        ws.column_dimensions[col].width = width
+    ws.append([styled_cell(ws, h, font=bold) for h in (
+        "INSURED", "AGE", "REMAINING LE (MONTHS)", "DEATH BENEFIT", "PREMIUMS NEXT 12 MONTHS",
+        "EXPECTED PREMIUMS (HORIZON)", "PROBABILITY OF MATURING IN 12 MONTHS",
+    )])
+    next_12 = p["premiums"][:, :12].sum(axis=1)
+    for i, name in enumerate(p["names"]):
+        ws.append([
+            name,
+            int(p["ages"][i]),
+            int(p["remaining_le_months"][i]),
+            styled_cell(ws, float(p["death_benefit"][i]), number_format=CURRENCY_FORMAT),
+            styled_cell(ws, float(next_12[i]), number_format=CURRENCY_FORMAT),
+            styled_cell(ws, float(p["policy_expected_premiums"][i]), number_format=CURRENCY_FORMAT),
+            styled_cell(ws, float(p["prob_mature_12m"][i]), number_format=PERCENT_FORMAT),
+        ])
+
+    wb.save(output_filename)
+    return output_filename
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Project premiums, death benefits and capital across every stored policy.")
+    parser.add_argument("--output", default="portfolio_projection.xlsx", help="Workbook to write")
+    parser.add_argument("--horizon", type=int, default=None, help="Months to project (default: longest LE + 36)")
+    parser.add_argument("--as-of", type=lambda t: datetime.strptime(t, "%Y-%m-%d").date(), default=None,
+                        metavar="YYYY-MM-DD", help="Valuation date (default: today)")
+    args = parser.parse_args(argv)
+
+    projection = project_portfolio(load_portfolio_records(), as_of=args.as_of, horizon_months=args.horizon)
+    export_portfolio_workbook(projection, args.output)
+    print(f"✅ {len(projection['names'])} policies projected to {args.output}; "
+          f"capital requirement ${projection['capital_requirement']:,.2f}.")
+    for s in projection["skipped"]:
+        print(f"❌ {s['insured_name']}: {s['error']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
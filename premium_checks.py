@@ -0,0 +1,147 @@
+"""
+Premium schedule checks run when a policy is onboarded (form or tape).
+
+validate_premiums() normalizes the pasted {year: [premiums]} once, with the same
+alignment rules generation uses (PremiumSchedule), and reports what looks wrong
+while someone can still fix it:
+
+    errors     lines that are not numbers, year keys outside YEAR_RANGE, years with
+               more than 12 entries (the extras would be dropped), negative premiums
+    warnings   gaps (a year or more with no premium inside the schedule), spikes
+               (a month far above the policy's typical premium), short years
+               after the first one (end-aligned, so they read as a mid-year
+               start), premiums that stop before the LE month or start more than
+               a year after the valuation month
+
+The normalized schedule is returned with its v1 cell (premium_codec, checksummed),
+which is what gets stored; generation decodes that series as-is.
+"""
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from premium_codec import encode_schedule
+from premium_schedule import PremiumSchedule
+from pricing import _elapsed_remaining_le
+
+GAP_MONTHS = 12     # a run of zero months this long inside the schedule is a gap
+SPIKE_RATIO = 5.0   # a month above this multiple of the median premium is a spike
+YEAR_RANGE = (1900, 2200)  # plausible premium years, inclusive
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _month_label(schedule: PremiumSchedule, i: int) -> str:
+    year, month0 = divmod(int(i), 12)
+    return f"{schedule.start_year + year}-{month0 + 1:02d}"
+
+
+def _runs(mask: np.ndarray) -> List[tuple]:
+    """(start, length) of every run of True in `mask`."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return [(int(a), int(b - a)) for a, b in zip(edges[::2], edges[1::2])]
+
+
+def validate_premiums(
+    premiums: Dict[int, List[float]],
+    le_months: int,
+    le_report_date: str,
+    as_of: Optional[date] = None,
+    rejected: Optional[Dict[int, List[str]]] = None,
+) -> Dict:
+    """
+    Check one policy's premiums against its LE, valued as of `as_of` (default today).
+    `rejected` maps a year to the pasted lines that did not parse (see parse_premiums_checked).
+
+    Returns {"schedule", "cell", "errors", "warnings", "flags"}: the normalized
+    PremiumSchedule, its encoded premiums cell, messages, and the sorted flag codes.
+    Years outside YEAR_RANGE are reported and left out of the schedule; "cell" is
+    None when the schedule cannot be encoded.
+    """
+    errors: List[str] = []
+    warnings: List[str] = []
+    flags = set()
+
+    for year, lines in sorted((rejected or {}).items()):
+        if lines:
+            flags.add("unparseable")
+            shown = ", ".join(repr(line) for line in lines[:3]) + (" ..." if len(lines) > 3 else "")
+            errors.append(f"{year}: {len(lines)} line(s) are not numbers ({shown})")
+
+    lo, hi = YEAR_RANGE
+    implausible = sorted(y for y in premiums if not lo <= y <= hi)
+    if implausible:
+        flags.add("bad_year")
+        errors.append(f"year(s) {', '.join(map(str, implausible[:3]))}{' ...' if len(implausible) > 3 else ''}"
+                      f" outside {lo}–{hi}")
+        premiums = {y: v for y, v in premiums.items() if lo <= y <= hi}
+
+    years = sorted(premiums)
+    for n, year in enumerate(years):
+        count = len(premiums[year])
+        if count > 12:
+            flags.add("over_12")
+            errors.append(f"{year}: {count} entries, at most 12 allowed")
+        elif 0 < count < 12 and n > 0:
+            flags.add("short_year")
+            warnings.append(
+                f"{year}: only {count} entries, placed {_MONTHS[12 - count]}–Dec (fewer than 12 align to year end)"
+            )
+
+    schedule = PremiumSchedule.from_year_map(premiums)
+    monthly = schedule.monthly
+    if np.any(monthly < 0):
+        flags.add("negative")
+        errors.append("negative premium in " + ", ".join(_month_label(schedule, i) for i in np.flatnonzero(monthly < 0)[:3]))
+
+    nonzero = np.flatnonzero(monthly)
+    if len(nonzero):
+        first, last = int(nonzero[0]), int(nonzero[-1])
+        for start, length in _runs(monthly[first:last + 1] == 0):
+            if length >= GAP_MONTHS:
+                flags.add("gap")
+                warnings.append(
+                    f"no premium for {length} months, {_month_label(schedule, first + start)}"
+                    f" to {_month_label(schedule, first + start + length - 1)}"
+                )
+
+        median = float(np.median(monthly[nonzero]))
+        spikes = nonzero[monthly[nonzero] > SPIKE_RATIO * median] if median > 0 else nonzero[:0]
+        if len(spikes):
+            flags.add("spike")
+            shown = ", ".join(f"{_month_label(schedule, i)} (${monthly[i]:,.2f})" for i in spikes[:3])
+            warnings.append(
+                f"{len(spikes)} month(s) above {SPIKE_RATIO:g}× the median premium of ${median:,.2f}: {shown}"
+                + (" ..." if len(spikes) > 3 else "")
+            )
+
+        today = as_of or date.today()
+        _, remaining_le_months, _ = _elapsed_remaining_le(le_months, le_report_date, today)
+        now = schedule.index(today.year, today.month - 1)
+        le_month = now + max(remaining_le_months - 1, 0)
+        if last < le_month:
+            flags.add("ends_before_le")
+            warnings.append(
+                f"premiums stop at {_month_label(schedule, last)}, before the LE month"
+                f" {_month_label(schedule, le_month)}; later months count as $0"
+            )
+        if first > now + 11:
+            flags.add("starts_late")
+            warnings.append(
+                f"first premium is {_month_label(schedule, first)}, more than a year after"
+                f" the valuation month {_month_label(schedule, now)}"
+            )
+
+    try:
+        cell = encode_schedule(schedule)
+    except ValueError as e:
+        cell = None
+        errors.append(str(e))
+
+    return {
+        "schedule": schedule,
+        "cell": cell,
+        "errors": errors,
+        "warnings": warnings,
+        "flags": sorted(flags),
+    }
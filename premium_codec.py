@@ -0,0 +1,163 @@
+"""
+Compact, versioned encoding of premium schedules for the sheet's premiums_json column.
+
+    v1:<base64>[#<crc>]
+                  base64 of a 4-byte header (uint16 start year, uint8 start month
+                  0..11, uint8 value type, little-endian) followed by the monthly
+                  premiums, leading and trailing zero months trimmed. Values are
+                  int32 cents when that is lossless (the usual case, roughly a
+                  third smaller than the JSON) and float64 otherwise. The optional
+                  suffix is the CRC-32 of the decoded bytes (8 hex digits); it is
+                  always written and checked whenever present, so a cell edited by
+                  hand fails loudly instead of pricing a different schedule.
+
+Decoding is a base64 decode plus np.frombuffer, with no per-element Python work.
+Cells that still hold the legacy JSON `{year: [premiums]}` blob are read through
+PremiumSchedule.from_year_map, so both formats can sit in the same column;
+migrate_sheet() rewrites the legacy cells in place.
+"""
+import argparse
+import base64
+import binascii
+import json
+import struct
+import zlib
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from premium_schedule import PremiumSchedule
+
+PREFIX_V1 = "v1:"
+_HEADER_V1 = struct.Struct("<HBB")
+_FLOAT64, _CENTS32 = 0, 1
+_CHECKSUM_SEP = "#"
+PREMIUMS_COLUMN = "premiums_json"
+
+
+def is_encoded(text) -> bool:
+    return isinstance(text, str) and text.startswith(PREFIX_V1)
+
+
+def _pack_v1(payload: bytes) -> str:
+    return f"{PREFIX_V1}{base64.b64encode(payload).decode('ascii')}{_CHECKSUM_SEP}{zlib.crc32(payload):08x}"
+
+
+def encode_schedule(schedule: PremiumSchedule) -> str:
+    """v1 cell for a schedule; ValueError when its years do not fit the header (0..65535)."""
+    monthly = schedule.monthly
+    nonzero = np.flatnonzero(monthly)
+    if len(nonzero) == 0:
+        return _pack_v1(_HEADER_V1.pack(0, 0, _FLOAT64))
+    first, last = int(nonzero[0]), int(nonzero[-1])
+    year, month0 = divmod(first, 12)
+    if not 0 <= schedule.start_year + year <= 0xFFFF:
+        raise ValueError(f"Premium schedule year {schedule.start_year + year} is out of range")
+    values = monthly[first:last + 1]
+    cents = np.round(values * 100.0)
+    if np.all(np.abs(cents) < 2**31) and np.array_equal(cents / 100.0, values):
+        kind, body = _CENTS32, cents.astype("<i4").tobytes()
+    else:
+        kind, body = _FLOAT64, values.astype("<f8").tobytes()
+    return _pack_v1(_HEADER_V1.pack(schedule.start_year + year, month0, kind) + body)
+
+
+def encode_premiums(premiums: Union[Dict, PremiumSchedule, None]) -> str:
+    """Encode a {year: [premiums]} map (same alignment rules as PremiumSchedule) or a schedule."""
+    return encode_schedule(PremiumSchedule.coerce(premiums))
+
+
+def _decode_v1(body: str) -> PremiumSchedule:
+    body, _, checksum = body.partition(_CHECKSUM_SEP)
+    try:
+        raw = base64.b64decode(body, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Malformed v1 premium schedule: {e}") from None
+    if checksum and checksum.lower() != f"{zlib.crc32(raw):08x}":
+        raise ValueError("v1 premium schedule failed its checksum (the cell was changed after encoding)")
+    if len(raw) < _HEADER_V1.size:
+        raise ValueError("Malformed v1 premium schedule: bad length")
+    start_year, month0, kind = _HEADER_V1.unpack_from(raw)
+    dtype = {_FLOAT64: "<f8", _CENTS32: "<i4"}.get(kind)
+    if dtype is None or (len(raw) - _HEADER_V1.size) % np.dtype(dtype).itemsize:
+        raise ValueError("Malformed v1 premium schedule: bad value type or length")
+    values = np.frombuffer(raw, dtype=dtype, offset=_HEADER_V1.size)
+    if kind == _CENTS32:
+        values = values / 100.0
+    if len(values) == 0:
+        return PremiumSchedule(0, [])
+    # Pad back to whole calendar years so `monthly[0]` is January of start_year
+    dense = np.zeros(-(-(month0 + len(values)) // 12) * 12, dtype=np.float64)
+    dense[month0:month0 + len(values)] = values
+    return PremiumSchedule(start_year, dense)
+
+
+def decode_schedule(text: Union[str, Dict, PremiumSchedule, None]) -> PremiumSchedule:
+    """Read a premiums cell in any supported format: v1, legacy JSON text, or an already-parsed map."""
+    if isinstance(text, PremiumSchedule):
+        return text
+    if isinstance(text, dict) or text is None:
+        return PremiumSchedule.from_year_map(text)
+    text = str(text).strip()
+    if text.startswith(PREFIX_V1):
+        return _decode_v1(text[len(PREFIX_V1):])
+    if text[:1] == "v" and ":" in text[:4]:
+        raise ValueError(f"Unsupported premium schedule version: {text.split(':', 1)[0]!r}")
+    return PremiumSchedule.from_year_map(json.loads(text) if text else {})
+
+
+def decode_year_map(text: Union[str, Dict, None]) -> Dict[int, List[float]]:
+    """{year: 12 monthly premiums} for every year the schedule covers."""
+    s = decode_schedule(text)
+    return {
+        s.start_year + i: s.monthly[i * 12:(i + 1) * 12].tolist()
+        for i in range(len(s.monthly) // 12)
+    }
+
+
+# === migration ===
+def migrate_sheet(sheet, column: str = PREMIUMS_COLUMN, dry_run: bool = False) -> Tuple[int, Dict[int, str]]:
+    """
+    Rewrite every legacy JSON premiums cell of `sheet` (a gspread worksheet) as v1,
+    in one batch_update. Cells already in v1 or empty are left alone, and so are
+    cells that cannot be read, which are reported instead of stopping the run.
+    Returns (cells converted, or that would be with dry_run; {sheet row: error}).
+    """
+    from gspread.utils import rowcol_to_a1
+
+    values = sheet.get_all_values()
+    if not values or column not in values[0]:
+        return 0, {}
+    col = values[0].index(column)
+    updates = []
+    failures: Dict[int, str] = {}
+    for r, row in enumerate(values[1:], start=2):
+        cell = row[col] if col < len(row) else ""
+        if not cell.strip() or is_encoded(cell):
+            continue
+        try:
+            encoded = encode_schedule(decode_schedule(cell))
+        except (ValueError, TypeError, AttributeError) as e:
+            failures[r] = f"{type(e).__name__}: {e}"
+            continue
+        updates.append({"range": rowcol_to_a1(r, col + 1), "values": [[encoded]]})
+    if updates and not dry_run:
+        sheet.batch_update(updates, value_input_option="RAW")
+    return len(updates), failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert the policy sheet's JSON premium cells to the v1 encoding.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the cells that would change")
+    args = parser.parse_args(argv)
+
+    from google_sheet_utils import get_sheet
+    n, failures = migrate_sheet(get_sheet(), dry_run=args.dry_run)
+    print(f"{'Would convert' if args.dry_run else 'Converted'} {n} premium cell(s).")
+    for row, error in failures.items():
+        print(f"❌ Row {row} left unchanged: {error}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+NumberLike = Union[float, int, str]
+
+
+def _clean_to_float(v: NumberLike) -> float:
+    """Convert numbers or currency-like strings to float; invalid -> 0.0"""
+    if isinstance(v, (int, float)):
+        return float(v)
+    if isinstance(v, str):
+        try:
+            return float(v.replace("$", "").replace(",", "").strip())
+        except Exception:
+            return 0.0
+    return 0.0
+
+
+def _coerce_year_key(k) -> Union[int, None]:
+    """Coerce year keys like '2025', '2025.0', 2025.0 -> 2025; return None if impossible."""
+    if isinstance(k, int):
+        return k
+    if isinstance(k, float):
+        return int(round(k))
+    if isinstance(k, str):
+        s = k.strip()
+        try:
+            return int(s)
+        except Exception:
+            try:
+                return int(float(s))
+            except Exception:
+                return None
+    return None
+
+
+def _align_year(values: List[float]) -> List[float]:
+    """
+    Place one year's entries on a Jan..Dec grid.
+    - 12 or more entries: the first 12 are Jan..Dec
+    - fewer than 12: entries align to the END of the year (last = December),
+      missing leading months are zeros (policy started mid-year)
+    """
+    n = len(values)
+    if n >= 12:
+        return values[:12]
+    return [0.0] * (12 - n) + values
+
+
+class PremiumSchedule:
+    """
+    Monthly premium schedule normalized once into a dense month series.
+
+    `monthly[i]` is the premium for month i counted from January of `start_year`.
+    A prefix-sum index makes every window sum (next N months, premiums to LE,
+    calendar-year totals) O(1); months outside the schedule are zero.
+    """
+
+    __slots__ = ("start_year", "monthly", "_prefix")
+
+    def __init__(self, start_year: int, monthly: Iterable[float]):
+        self.start_year = int(start_year)
+        self.monthly = np.ascontiguousarray(monthly, dtype=np.float64)
+        self._prefix = np.zeros(len(self.monthly) + 1, dtype=np.float64)
+        np.cumsum(self.monthly, out=self._prefix[1:])
+
+    @classmethod
+    def from_year_map(cls, monthly_premiums: Optional[Dict]) -> "PremiumSchedule":
+        """Build from the stored {year: [months]} dict (year keys and values may be strings)."""
+        years: Dict[int, List[float]] = {}
+        for k, v in (monthly_premiums or {}).items():
+            y = _coerce_year_key(k)
+            if y is None:
+                continue
+            years[y] = [_clean_to_float(x) for x in v] if isinstance(v, (list, tuple)) else []
+        if not years:
+            return cls(0, [])
+        first, last = min(years), max(years)
+        dense = np.zeros((last - first + 1) * 12, dtype=np.float64)
+        for y, vals in years.items():
+            if vals:
+                i = (y - first) * 12
+                dense[i:i + 12] = _align_year(vals)
+        return cls(first, dense)
+
+    @classmethod
+    def coerce(cls, value: Union["PremiumSchedule", Dict, str, None]) -> "PremiumSchedule":
+        """Accept a ready schedule, a raw {year: [months]} dict or a stored premiums cell (v1 or JSON)."""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            from premium_codec import decode_schedule
+            return decode_schedule(value)
+        return cls.from_year_map(value)
+
+    def __len__(self) -> int:
+        return len(self.monthly)
+
+    @property
+    def end_year(self) -> int:
+        """Last calendar year covered (inclusive)."""
+        return self.start_year + max(len(self.monthly) // 12, 1) - 1
+
+    def index(self, year: int, month_idx0: int) -> int:
+        """Offset of (year, 0-based month) into `monthly`; may fall outside the series."""
+        return (int(year) - self.start_year) * 12 + int(month_idx0)
+
+    def month_value(self, year: int, month_idx0: int) -> float:
+        i = self.index(year, month_idx0)
+        return float(self.monthly[i]) if 0 <= i < len(self.monthly) else 0.0
+
+    def sum_next(self, year: int, month_idx0: int, n: int) -> float:
+        """Sum of n months starting at (year, month), current month included."""
+        if n <= 0:
+            return 0.0
+        i = self.index(year, month_idx0)
+        last = len(self.monthly)
+        lo, hi = min(max(i, 0), last), min(max(i + n, 0), last)
+        return float(self._prefix[hi] - self._prefix[lo])
+
+    def sum_next_many(self, year: int, month_idx0: int, ns: Iterable[int]) -> np.ndarray:
+        """Vectorized sum_next for many window lengths from the same start month."""
+        ns = np.maximum(np.asarray(ns, dtype=np.int64), 0)
+        last = len(self.monthly)
+        i = self.index(year, month_idx0)
+        lo = min(max(i, 0), last)
+        hi = np.clip(i + ns, 0, last)
+        return np.where(ns > 0, self._prefix[hi] - self._prefix[lo], 0.0)
+
+    def premiums_to_le(self, year: int, month_idx0: int, rem_le_months: int) -> float:
+        """Premiums from the current month through the LE month (rem_le_months months)."""
+        return self.sum_next(year, month_idx0, rem_le_months)
+
+    def annual_total(self, year: int) -> float:
+        return self.sum_next(year, 0, 12)
+
+    def annual_totals(self, years: Iterable[int]) -> np.ndarray:
+        years = np.asarray(list(years), dtype=np.int64)
+        last = len(self.monthly)
+        lo = np.clip((years - self.start_year) * 12, 0, last)
+        hi = np.clip((years - self.start_year) * 12 + 12, 0, last)
+        return self._prefix[hi] - self._prefix[lo]
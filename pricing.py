@@ -0,0 +1,163 @@
+"""
+Pricing math behind the purchase and resale templates (no openpyxl).
+
+The *_figures functions return every number a template shows, so callers can
+cache, compare or render them without touching a workbook.
+"""
+from datetime import date, datetime
+from typing import Dict, Optional, Union
+
+from instrumentation import traced
+from premium_schedule import NumberLike, PremiumSchedule, _clean_to_float
+
+RESALE_HORIZONS = (24, 36, 48, 60)  # months from today; resale template rows 8..11
+RESALE_TARGET_RETURN = 0.18         # Client 2's average annual return to LE
+
+
+def _elapsed_remaining_le(le_months: int, le_report_date: str, as_of: Optional[date] = None) -> tuple[int,int,int]:
+    # (elapsed_months, remaining_le_months, remaining_le_years)
+    le_dt = datetime.strptime(le_report_date, "%Y-%m-%d")
+    today = as_of or date.today()
+    elapsed = (today.year - le_dt.year) * 12 + (today.month - le_dt.month)
+    rem = max(int(le_months) - elapsed, 0)
+    rem_years = (rem + 11) // 12
+    return elapsed, rem, rem_years
+
+def _age_today(dob: str, le_report_date: str, elapsed_months: int) -> int:
+    dob_dt = datetime.strptime(dob, "%Y-%m-%d")
+    le_dt = datetime.strptime(le_report_date, "%Y-%m-%d")
+    return int((le_dt - dob_dt).days / 365.25 + elapsed_months / 12)
+
+def _return_table_rows(
+    start_year: int,
+    total_years: int,
+    remaining_le_years: int,
+    annual_premiums,
+    investment: float,
+    death_benefit: float,
+):
+    """Yield the year-by-year rows (A..H) of the purchase template."""
+    cumulative = 0.0
+    for i in range(total_years):
+        year = start_year + i
+        premium = float(annual_premiums[i])
+        cumulative += premium
+        total_cost = float(investment) + cumulative
+        profit = float(death_benefit) - total_cost
+        simple_return = (profit / total_cost) if total_cost else 0.0
+        acc_return = (simple_return / (i + 1)) if (i + 1) else 0.0
+
+        marker = ""
+        if i == remaining_le_years - 1:
+            marker = "LE"
+        elif i == remaining_le_years:
+            marker = "LE+1"
+        elif i == remaining_le_years + 1:
+            marker = "LE+2"
+        elif i == remaining_le_years + 2:
+            marker = "LE+3"
+
+        yield [
+            year,
+            premium,
+            cumulative,
+            total_cost,
+            profit,
+            simple_return,
+            acc_return,
+            marker
+        ]
+
+@traced("pricing.purchase")
+def purchase_figures(
+    dob: str,
+    le_months: int,
+    le_report_date: str,
+    death_benefit: float,
+    investment: float,
+    monthly_premiums: Union[Dict, PremiumSchedule],
+    as_of: Optional[date] = None,
+) -> Dict:
+    """Header values and year-by-year rows of the purchase template, valued as of `as_of` (default today)."""
+    today = as_of or date.today()
+    elapsed_months, remaining_le_months, remaining_le_years = _elapsed_remaining_le(le_months, le_report_date, today)
+    total_years = remaining_le_years + 3
+    start_year = today.year
+
+    # Approximate age at "today" anchored from LE report date + elapsed months
+    age = _age_today(dob, le_report_date, elapsed_months)
+
+    # Normalize premiums once (robust year keys / string inputs); totals come from prefix sums
+    schedule = PremiumSchedule.coerce(monthly_premiums)
+    annual_premiums = schedule.annual_totals(range(start_year, start_year + total_years))
+
+    # Next 3 months of premiums (including this month); year wrap handled by the dense series
+    next_three_sum = schedule.sum_next(today.year, today.month - 1, 3)
+
+    return {
+        "as_of": today,
+        "age": age,
+        "remaining_le_months": remaining_le_months,
+        "remaining_le_years": remaining_le_years,
+        "start_year": start_year,
+        "total_years": total_years,
+        "next_three_sum": next_three_sum,
+        "rows": list(_return_table_rows(start_year, total_years, remaining_le_years, annual_premiums, investment, death_benefit)),
+    }
+
+@traced("pricing.resale")
+def resale_figures(
+    dob: str,
+    le_months: int,
+    le_report_date: str,
+    death_benefit: NumberLike,
+    investment: NumberLike,
+    monthly_premiums: Union[Dict, PremiumSchedule],
+    as_of: Optional[date] = None,
+) -> Dict:
+    """
+    Resale template numbers, valued as of `as_of` (default today).
+    `rows` holds columns B..G (effective LE, cumulative premiums, remaining premiums
+    to LE, resale price, Client 1 proceeds, annualized return) for rows 8..11.
+    """
+    today = as_of or date.today()
+    this_year, this_month_idx0 = today.year, today.month - 1  # 0-based month
+    elapsed, remaining_le_months, _ = _elapsed_remaining_le(int(le_months), le_report_date, today)
+    age = _age_today(dob, le_report_date, elapsed)
+
+    schedule = PremiumSchedule.coerce(monthly_premiums)
+    DB = _clean_to_float(death_benefit)
+    COST0 = _clean_to_float(investment)
+
+    # Cumulative premiums from today (C): 24/36/48/60 months, one vectorized lookup
+    cumulative = schedule.sum_next_many(this_year, this_month_idx0, RESALE_HORIZONS)
+    # Premiums to LE (baseline) for the D deltas
+    P_LE = schedule.premiums_to_le(this_year, this_month_idx0, remaining_le_months)
+
+    # Resale price (Client 2 buys; 18% avg return to LE)
+    def _resale_price(Bm, Dm):
+        denom = (RESALE_TARGET_RETURN * max(Bm, 0)) + 12.0
+        return ((12.0 * DB) - (12.0 * Dm)) / denom if denom > 0 else 0.0
+
+    def _ann_return(Fm, Cm, yrs):
+        base = COST0 + Cm
+        return (Fm / base / yrs) if base > 0 and yrs > 0 else 0.0
+
+    rows = []
+    for months, Cm in zip(RESALE_HORIZONS, cumulative):
+        Cm = float(Cm)
+        Bm = max(remaining_le_months - months, 0)   # effective months at resale
+        Dm = max(P_LE - Cm, 0.0)
+        Em = _resale_price(Bm, Dm)
+        Fm = Em - Cm - COST0                         # Client 1 proceeds
+        Gm = _ann_return(Fm, Cm, months // 12)
+        rows.append([Bm, Cm, Dm, Em, Fm, Gm])
+
+    return {
+        "as_of": today,
+        "age": age,
+        "remaining_le_months": remaining_le_months,
+        "death_benefit": DB,
+        "cost": COST0,
+        "rows": rows,
+    }
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from instrumentation import traced
+from premium_schedule import PremiumSchedule
+from pricing import purchase_figures, resale_figures
+from resale_scenarios import resale_grid
+
+POLICY_FIELDS = ("insured_name", "dob", "carrier", "le_months", "le_report_date", "death_benefit")
+KINDS = ("purchase", "resale")
+
+
+def _premiums_fingerprint(monthly_premiums) -> str:
+    if isinstance(monthly_premiums, PremiumSchedule):
+        h = hashlib.sha256(monthly_premiums.monthly.tobytes())
+        return f"{monthly_premiums.start_year}:{h.hexdigest()}"
+    normalized = {str(k): v for k, v in (monthly_premiums or {}).items()}
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+def pricing_key(
+    kind: str,
+    policy: Dict,
+    investment: float,
+    as_of: date,
+    sensitivity: bool = False,
+    simulate_paths: int = 0,
+) -> str:
+    """Hash of the policy fields, premiums, client cost and valuation date."""
+    if sensitivity:
+        kind = f"{kind}+sensitivity"
+    if simulate_paths:
+        kind = f"{kind}+simulation:{int(simulate_paths)}"
+    payload = [
+        kind,
+        [str(policy.get(f)) for f in POLICY_FIELDS],
+        _premiums_fingerprint(policy.get("monthly_premiums")),
+        repr(float(investment)),
+        as_of.isoformat(),  # the full date: the templates print it (resale F1, simulation sheet)
+    ]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def render_key(kind: str, policy: Dict) -> str:
+    """Hash of what stays fixed across re-pricings: kind, policy fields and premiums."""
+    payload = [kind, [str(policy.get(f)) for f in POLICY_FIELDS], _premiums_fingerprint(policy.get("monthly_premiums"))]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+class PricingCache:
+    """
+    LRU cache of pricing results: the computed figures plus the rendered xlsx bytes.
+
+    Entries are keyed by `pricing_key` (policy inputs, client cost, valuation date),
+    so the same policy priced again on the same day is served from memory. With
+    `disk_dir`, entries are also written there and reloaded after an in-memory miss
+    (e.g. after a restart); a memory hit never touches the disk.
+
+    On a miss, the last rendered workbook of the same policy (up to `max_renders`
+    policies, memory only) is reused when only the valuation date or client cost
+    changed: its PremiumSchedule is kept and only the cells whose value changed are
+    rewritten. A different table shape falls back to a full render.
+    """
+
+    def __init__(self, max_entries: int = 128, disk_dir: Optional[Union[str, Path]] = None, max_renders: int = 32):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_renders = max_renders
+        self._renders: "OrderedDict[str, Dict]" = OrderedDict()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "incremental": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.pkl"
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry
+        if self.disk_dir is not None:
+            try:
+                entry = pickle.loads(self._disk_path(key).read_bytes())
+            except (OSError, pickle.UnpicklingError, EOFError):
+                entry = None
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self._remember(key, entry)
+                return entry
+        return None
+
+    def _remember(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key: str, entry: Dict) -> None:
+        self._remember(key, entry)
+        if self.disk_dir is not None:
+            fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._disk_path(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._renders.clear()
+
+    def _take_render(self, key: str) -> Optional[Dict]:
+        # Removed while in use so two requests never edit the same workbook
+        with self._lock:
+            return self._renders.pop(key, None) if self.max_renders else None
+
+    def _keep_render(self, key: str, render: Dict) -> None:
+        if not self.max_renders:
+            return
+        with self._lock:
+            self._renders[key] = render
+            self._renders.move_to_end(key)
+            while len(self._renders) > self.max_renders:
+                self._renders.popitem(last=False)
+
+    @traced("pricing_cache.template")
+    def template(
+        self,
+        kind: str,
+        policy: Dict,
+        investment: float,
+        as_of: Optional[date] = None,
+        sensitivity: bool = False,
+        simulate_paths: int = 0,
+    ) -> Tuple[Dict, bytes]:
+        """
+        (figures, xlsx bytes) for one policy and client cost, computed and rendered
+        only on a cache miss. `policy` carries POLICY_FIELDS plus "monthly_premiums".
+        `sensitivity` adds the resale grid sheets (resale only); `simulate_paths`
+        adds the Monte Carlo mortality sheet (purchase only).
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown template kind: {kind!r} (expected one of {KINDS})")
+        as_of = as_of or date.today()
+        sensitivity = sensitivity and kind == "resale"
+        simulate_paths = simulate_paths if kind == "purchase" else 0
+        key = pricing_key(kind, policy, investment, as_of, sensitivity, simulate_paths)
+        entry = self.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            rkey = render_key(kind, policy)
+            previous = self._take_render(rkey)
+            entry, render = _price_and_render(kind, policy, investment, as_of, sensitivity, simulate_paths, previous)
+            if render["incremental"]:
+                self.stats["incremental"] += 1
+            self._keep_render(rkey, render)
+            self.put(key, entry)
+        return entry["figures"], entry["xlsx"]
+
+
+def _price_and_render(
+    kind: str,
+    policy: Dict,
+    investment: float,
+    as_of: date,
+    sensitivity: bool = False,
+    simulate_paths: int = 0,
+    previous: Optional[Dict] = None,
+) -> Tuple[Dict, Dict]:
+    """
+    (cache entry, render state). `previous` is the render state of an earlier call
+    for the same policy: its schedule is reused, and its workbook is updated in place
+    when the layout (workbook_shape) is unchanged.
+    """
+    from mortality_simulation import simulate_policy
+    from template_generator import (
+        SIMULATION_SEED,
+        add_resale_sensitivity_sheets,
+        add_simulation_sheet,
+        build_resale_workbook,
+        build_return_workbook,
+        remove_extra_sheets,
+        resale_cell_values,
+        return_cell_values,
+        update_cells,
+        workbook_bytes,
+        workbook_shape,
+    )
+
+    schedule = previous["schedule"] if previous else PremiumSchedule.coerce(policy.get("monthly_premiums"))
+    args = (policy["dob"], policy["le_months"], policy["le_report_date"], policy["death_benefit"], investment, schedule)
+    if kind == "purchase":
+        figures = purchase_figures(*args, as_of=as_of)
+        cells = return_cell_values(policy["insured_name"], policy["carrier"], policy["death_benefit"], investment, figures)
+    else:
+        figures = resale_figures(*args, as_of=as_of)
+        cells = resale_cell_values(policy["insured_name"], policy["carrier"], figures)
+    shape = workbook_shape(kind, figures)
+
+    incremental = previous is not None and previous["shape"] == shape
+    if incremental:
+        wb = previous["wb"]
+        remove_extra_sheets(wb)
+        update_cells(wb, previous["cells"], cells)
+    elif kind == "purchase":
+        wb = build_return_workbook(policy["insured_name"], policy["carrier"], policy["death_benefit"], investment, figures)
+    else:
+        wb = build_resale_workbook(policy["insured_name"], policy["carrier"], figures)
+
+    if kind == "purchase" and simulate_paths:
+        add_simulation_sheet(wb, simulate_policy(*args, n_paths=simulate_paths, seed=SIMULATION_SEED, as_of=as_of))
+    if kind == "resale" and sensitivity:
+        add_resale_sensitivity_sheets(wb, resale_grid(*args[1:], as_of=as_of))
+    entry = {"figures": figures, "xlsx": workbook_bytes(wb)}
+    render = {"wb": wb, "cells": cells, "schedule": schedule, "shape": shape, "incremental": incremental}
+    return entry, render
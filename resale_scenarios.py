@@ -0,0 +1,73 @@
+"""
+Resale sensitivity grid: resale price, Client 1 proceeds and annualized return for
+every resale month from now to LE+36 against a range of Client 2 target returns.
+
+The grid is the resale template's row formula (pricing.resale_figures) evaluated
+as one NumPy batch over prefix-summed premiums instead of cell by cell.
+"""
+from datetime import date
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from premium_schedule import NumberLike, PremiumSchedule, _clean_to_float
+from pricing import _elapsed_remaining_le
+
+GRID_MONTHS_PAST_LE = 36
+
+
+def default_target_returns() -> np.ndarray:
+    """10% .. 30% in 0.5% steps."""
+    return np.round(np.arange(0.10, 0.30 + 1e-9, 0.005), 4)
+
+
+def resale_grid(
+    le_months: int,
+    le_report_date: str,
+    death_benefit: NumberLike,
+    investment: NumberLike,
+    monthly_premiums: Union[Dict, PremiumSchedule],
+    target_returns: Optional[Sequence[float]] = None,
+    as_of: Optional[date] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Resale scenarios valued as of `as_of` (default today).
+
+    `months` (T,) are resale points 1..LE+36 months from now and `target_returns` (R,)
+    are Client 2's annual returns. Per-month vectors: `cumulative` (premiums paid by
+    Client 1 until resale), `effective_le`, `remaining_to_le`. (T, R) matrices:
+    `resale_price`, `proceeds` (Client 1 profit) and `annualized_return`.
+    """
+    today = as_of or date.today()
+    _, remaining_le_months, _ = _elapsed_remaining_le(int(le_months), le_report_date, today)
+    schedule = PremiumSchedule.coerce(monthly_premiums)
+    DB = _clean_to_float(death_benefit)
+    COST0 = _clean_to_float(investment)
+
+    months = np.arange(1, remaining_le_months + GRID_MONTHS_PAST_LE + 1)
+    rates = np.asarray(default_target_returns() if target_returns is None else target_returns, dtype=np.float64)
+
+    cumulative = schedule.sum_next_many(today.year, today.month - 1, months)
+    p_le = schedule.premiums_to_le(today.year, today.month - 1, remaining_le_months)
+    effective_le = np.maximum(remaining_le_months - months, 0)
+    remaining_to_le = np.maximum(p_le - cumulative, 0.0)
+
+    denom = rates[None, :] * effective_le[:, None] + 12.0
+    numer = (12.0 * DB - 12.0 * remaining_to_le)[:, None]
+    resale_price = np.divide(numer, denom, out=np.zeros_like(denom), where=denom > 0)
+    proceeds = resale_price - cumulative[:, None] - COST0
+
+    base = (COST0 + cumulative)[:, None] * (months / 12.0)[:, None]
+    annualized = np.divide(proceeds, base, out=np.zeros_like(proceeds), where=np.broadcast_to(base > 0, proceeds.shape))
+
+    return {
+        "as_of": today,
+        "months": months,
+        "target_returns": rates,
+        "cumulative": cumulative,
+        "effective_le": effective_le,
+        "remaining_to_le": remaining_to_le,
+        "resale_price": resale_price,
+        "proceeds": proceeds,
+        "annualized_return": annualized,
+    }
@@ -1,248 +1,225 @@
+import pickle
+import threading
+from copy import copy
+from datetime import date
+from io import BytesIO
 from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill
-from datetime import datetime, date
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import ColorScaleRule
+from openpyxl.styles import Font, NamedStyle, PatternFill
+from openpyxl.utils import get_column_letter
+from openpyxl.workbook import Workbook
+from openpyxl.worksheet.hyperlink import Hyperlink
 from pathlib import Path
-from typing import Dict, List, Union
-from openpyxl import load_workbook
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
-NumberLike = Union[float, int, str]
-
-def _clean_to_float(v: NumberLike) -> float:
-    if isinstance(v, (int, float)): return float(v)
-    if isinstance(v, str):
-        try: return float(v.replace("$","").replace(",","").strip())
-        except: return 0.0
-    return 0.0
-
-def _coerce_year_key(k) -> int | None:
-    try: return int(str(k).strip())
-    except: return None
-
-def _elapsed_remaining_le(le_months: int, le_report_date: str) -> tuple[int,int,int]:
-    # (elapsed_months, remaining_le_months, remaining_le_years)
-    le_dt = datetime.strptime(le_report_date, "%Y-%m-%d")
-    today = date.today()
-    elapsed = (today.year - le_dt.year) * 12 + (today.month - le_dt.month)
-    rem = max(int(le_months) - elapsed, 0)
-    rem_years = (rem + 11) // 12
-    return elapsed, rem, rem_years
-
-def _age_today(dob: str, le_report_date: str, elapsed_months: int) -> int:
-    dob_dt = datetime.strptime(dob, "%Y-%m-%d")
-    le_dt = datetime.strptime(le_report_date, "%Y-%m-%d")
-    return int((le_dt - dob_dt).days / 365.25 + elapsed_months / 12)
-
-def _normalize_month_map(monthly_premiums: Dict) -> Dict[int, List[float]]:
-    # {year: [ ... months ... ]}, keep only int year keys; coerce values to float list
-    out: Dict[int, List[float]] = {}
-    for k, v in (monthly_premiums or {}).items():
-        y = _coerce_year_key(k)
-        if y is None: continue
-        if not isinstance(v, (list, tuple)):
-            out[y] = []
-            continue
-        out[y] = [_clean_to_float(x) for x in v]
-    return out
+from instrumentation import span, traced
+from premium_schedule import NumberLike, PremiumSchedule
+from pricing import RESALE_HORIZONS, purchase_figures, resale_figures
+from resale_scenarios import resale_grid
+from mortality_simulation import PERCENTILES, simulate_policy
+
+# === template cache ===
+RETURN_TEMPLATE_NAME = "return_template_output.xlsx"
+RESALE_TEMPLATE_NAME = "Resale Template Sample.xlsx"
+
+_template_lock = threading.Lock()
+_template_cache: Dict[Tuple[str, int, Optional[str]], bytes] = {}
+
+def _find_template(name: str) -> Path:
+    # Same lookup the resale generator always used: next to this .py, then project root (cwd)
+    here = Path(__file__).resolve().parent
+    for p in (here / name, Path.cwd() / name):
+        if p.exists():
+            return p
+    raise FileNotFoundError(f"{name} not found in repo. Place it next to template_generator.py or at project root.")
 
-def _month_value_for(year: int, month_idx0: int, year_map: Dict[int, List[float]]) -> float:
+def load_template(name: str, prepare: Optional[Callable[[Workbook], None]] = None) -> Workbook:
     """
-    0-based month; align arrays to end of year:
-    - if len(list) == 12: direct index
-    - if len(list) < 12: last element = December; missing leading months are zeros
+    Return a fresh, private copy of a template workbook.
+    Each template is parsed with load_workbook once per (path, mtime); later calls
+    unpickle an in-memory snapshot instead of unzipping/parsing the XLSX again, so
+    callers can modify the returned workbook freely.
+    `prepare`, if given, runs once on the parsed workbook before it is snapshotted
+    (e.g. to strip stale output rows), and is part of the cache key.
     """
-    arr = year_map.get(year, [])
-    L = len(arr)
-    if L == 12:
-        return arr[month_idx0]
-    if L == 0:
-        return 0.0
-    start_at = 12 - L  # first filled month index
-    if month_idx0 < start_at:
-        return 0.0
-    return arr[month_idx0 - start_at]
-
-def _sum_next_n_months(start_year: int, start_month_idx0: int, n: int, year_map: Dict[int, List[float]]) -> float:
-    total = 0.0
-    y, m = start_year, start_month_idx0
-    for _ in range(max(n, 0)):
-        total += _month_value_for(y, m, year_map)
-        m += 1
-        if m == 12:
-            m = 0
-            y += 1
-    return total
-
-def _premiums_to_le(start_year: int, start_month_idx0: int, rem_le_months: int, year_map: Dict[int, List[float]]) -> float:
-    if rem_le_months <= 0:
-        return 0.0
-    # include current month + next (rem_le_months-1)
-    return _sum_next_n_months(start_year, start_month_idx0, rem_le_months, year_map)
-# === end helpers ===
-
-
-def _clean_to_float(v: NumberLike) -> float:
-    """Convert numbers or currency-like strings to float; invalid -> 0.0"""
-    if isinstance(v, (int, float)):
-        return float(v)
-    if isinstance(v, str):
-        try:
-            return float(v.replace("$", "").replace(",", "").strip())
-        except Exception:
-            return 0.0
-    return 0.0
-
-def _coerce_year_key(k) -> Union[int, None]:
-    """Coerce year keys like '2025', '2025.0', 2025.0 -> 2025; return None if impossible."""
-    if isinstance(k, int):
-        return k
-    if isinstance(k, float):
-        return int(round(k))
-    if isinstance(k, str):
-        s = k.strip()
-        try:
-            return int(s)
-        except Exception:
-            try:
-                return int(float(s))
-            except Exception:
-                return None
-    return None
-
-def _get_monthly_premium_frontfill_tail(
-    mp_dict: Dict[int, List[NumberLike]],
-    year: int,
-    month_1based: int
-) -> float:
+    path = _find_template(name)
+    key = (path.as_posix(), path.stat().st_mtime_ns, getattr(prepare, "__qualname__", None))
+    snapshot = _template_cache.get(key)
+    if snapshot is None:
+        with _template_lock:
+            snapshot = _template_cache.get(key)
+            if snapshot is None:
+                with span("template.load_workbook", template=path.name):
+                    wb = load_workbook(path.as_posix())
+                if prepare is not None:
+                    prepare(wb)
+                snapshot = pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL)
+                # Drop snapshots of older versions of the same file
+                for stale in [k for k in _template_cache if k[0] == key[0] and k[1] != key[1]]:
+                    del _template_cache[stale]
+                _template_cache[key] = snapshot
+    with span("template.clone", template=path.name):
+        return pickle.loads(snapshot)
+
+def clear_template_cache() -> None:
+    with _template_lock:
+        _template_cache.clear()
+
+RETURN_HEADER_ROWS = 6  # rows 1..6 are the header block; year rows start at 7
+
+@traced("template.reset")
+def reset_return_template(wb: Workbook) -> None:
+    """Remove every row below the purchase-template header in one delete_rows call."""
+    ws = wb.active
+    stale = ws.max_row - RETURN_HEADER_ROWS
+    if stale > 0:
+        ws.delete_rows(RETURN_HEADER_ROWS + 1, stale)
+# === end template cache ===
+
+
+CURRENCY_FORMAT = '"$"#,##0.00'
+PERCENT_FORMAT = '0.00%'
+LE_FILL_COLOR = "ADD8E6"
+
+def _copy_cell_style(src, dst) -> None:
+    if src.has_style:
+        dst.font = copy(src.font)
+        dst.fill = copy(src.fill)
+        dst.border = copy(src.border)
+        dst.alignment = copy(src.alignment)
+        dst.protection = copy(src.protection)
+        dst.number_format = src.number_format
+
+def _stream_return_workbook(template: Workbook, header: Dict[str, object], rows, le_index: int) -> Workbook:
     """
-    Return the premium for (year, month). Each year maps to a list of monthly values.
-    If a year has < 12 entries, assume the missing months are at the FRONT (Jan..),
-    i.e., the provided values align to the END of the year (… Sep, Oct, Nov, Dec).
-    Example: 9 entries -> treat Jan/Feb/Mar as 0, entries correspond to Apr..Dec.
+    Write the purchase template through a write_only workbook in a single pass:
+    the header block is copied from the (header-only) template with `header` values
+    applied, then each year row is streamed with its final styles and formats.
     """
-    lst = mp_dict.get(year)
-    if not isinstance(lst, (list, tuple)):
-        return 0.0
-
-    clean = [_clean_to_float(x) for x in lst]
-    n = len(clean)
-
-    # Clamp month to [1..12]
-    m = max(1, min(12, month_1based))
-
-    if n >= 12:
-        return clean[m - 1]
-
-    # Front-fill zeros: provided values occupy the LAST n months of the year
-    offset = 12 - n  # number of missing months at the start (treated as zeros)
-    idx = (m - 1) - offset
-    if idx < 0 or idx >= n:
-        return 0.0
-    return clean[idx]
-
-def generate_return_template(
+    src = template.active
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(src.title)
+    # Unstyled cells of the in-memory path render in the template's default font;
+    # a fresh cell on the template sheet reports it. Streamed cells get it explicitly.
+    default_font = copy(WriteOnlyCell(src).font)
+
+    # Each distinct style is built once; later cells reuse its style array
+    # (registering copied style objects per cell dominated the streaming time)
+    styles: Dict[tuple, object] = {}
+
+    def styled(value, key, apply) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        style = styles.get(key)
+        if style is None:
+            apply(cell)
+            styles[key] = copy(cell._style)
+        else:
+            cell._style = copy(style)
+        return cell
+
+    # Sheet layout must be in place before the first row is written
+    for key, dim in src.column_dimensions.items():
+        if dim.width:
+            ws.column_dimensions[key].width = dim.width
+    for idx, dim in src.row_dimensions.items():
+        if dim.height:
+            ws.row_dimensions[idx].height = dim.height
+    for rng in src.merged_cells.ranges:
+        ws.merged_cells.add(rng.coord)
+    ws.freeze_panes = src.freeze_panes
+
+    def header_style(src_cell):
+        def apply(cell):
+            if src_cell.has_style:
+                _copy_cell_style(src_cell, cell)
+            else:
+                cell.font = default_font
+            if src_cell.coordinate == "E5":
+                cell.number_format = CURRENCY_FORMAT
+        return apply
+
+    # Header block (rows 1..6)
+    for src_row in src.iter_rows(min_row=1, max_row=RETURN_HEADER_ROWS, max_col=max(src.max_column, 8)):
+        ws.append([
+            styled(header.get(c.coordinate, c.value), ("header", tuple(c._style), c.coordinate == "E5"), header_style(c))
+            for c in src_row
+        ])
+
+    # Styles shared by every streamed row; column A copies B6 like the in-memory path
+    ref = src["B6"]
+    le_font = Font(bold=True)
+    le_fill = PatternFill(start_color=LE_FILL_COLOR, end_color=LE_FILL_COLOR, fill_type="solid")
+
+    def row_style(col, le, empty):
+        def apply(cell):
+            if col == 1:
+                _copy_cell_style(ref, cell)
+                if not ref.has_style:
+                    cell.font = default_font
+                return
+            if le:
+                cell.font = le_font
+            elif not (empty and col == 8):  # an empty unformatted cell stays unstyled, as in memory
+                cell.font = default_font
+            if le:
+                cell.fill = le_fill
+            if 2 <= col <= 5:
+                cell.number_format = CURRENCY_FORMAT
+            elif 6 <= col <= 7:
+                cell.number_format = PERCENT_FORMAT
+        return apply
+
+    for i, values in enumerate(rows):
+        le = i == le_index
+        ws.append([
+            styled(value, ("row", col, le, value in (None, "")), row_style(col, le, value in (None, "")))
+            for col, value in enumerate(values, start=1)
+        ])
+
+    return wb
+
+@traced("template.style.purchase")
+def build_return_workbook(
     insured_name: str,
-    dob: str,
     carrier: str,
-    le_months: int,
-    le_report_date: str,
     death_benefit: float,
     investment: float,
-    monthly_premiums: Dict[int, List[float]],
-    output_filename: str
-) -> str:
-    # Parse dates / anchors
-    dob_dt = datetime.strptime(dob, "%Y-%m-%d")
-    le_report_dt = datetime.strptime(le_report_date, "%Y-%m-%d")
-    today = date.today()
-
-    # Elapsed/remaining LE
-    elapsed_months = (today.year - le_report_dt.year) * 12 + today.month - le_report_dt.month
-    remaining_le_months = max(le_months - elapsed_months, 0)
-    remaining_le_years = (remaining_le_months + 11) // 12
-    total_years = remaining_le_years + 3
-    start_year = today.year
-
-    # Approximate age at "today" anchored from LE report date + elapsed months
-    age = int((le_report_dt - dob_dt).days / 365.25 + elapsed_months / 12)
-
-    # Coerce year keys robustly and keep only valid ones
-    monthly_premiums = {
-        yk: v for k, v in (monthly_premiums or {}).items()
-        if (yk := _coerce_year_key(k)) is not None
+    figures: Dict,
+    write_only: bool = False
+) -> Workbook:
+    """Fill the purchase template from `purchase_figures(...)`; the caller saves it."""
+    remaining_le_years = figures["remaining_le_years"]
+    total_years = figures["total_years"]
+    header = {
+        "B1": insured_name,
+        "B2": f"AGE: {figures['age']}",
+        "B3": f"CARRIER: {carrier}",
+        "E2": f"{figures['remaining_le_months']} MONTHS",
+        "E3": death_benefit,
+        "E4": investment,
+        "E5": figures["next_three_sum"],
     }
+    rows = figures["rows"]
 
-    # Annual premium totals (robust to string inputs)
-    annual_premiums: Dict[int, float] = {}
-    for year, months in monthly_premiums.items():
-        if not isinstance(months, (list, tuple)):
-            annual_premiums[year] = 0.0
-            continue
-        annual_premiums[year] = sum(_clean_to_float(x) for x in months)
-
-    # Load template and clear old output rows (keep headers up to row 6)
-    wb = load_workbook("return_template_output.xlsx")
+    # Load template with old output rows already cleared (headers up to row 6 kept)
+    wb = load_template(RETURN_TEMPLATE_NAME, prepare=reset_return_template)
     ws = wb.active
 
-    for _ in range(7, ws.max_row + 1):
-        ws.delete_rows(7)
+    # Clear any "LE Marker" header label in H6 to keep header area clean
+    if ws["H6"].value == "LE Marker":
+        header["H6"] = ""
+
+    if write_only:
+        return _stream_return_workbook(wb, header, rows, remaining_le_years - 1)
 
     # Header cells
-    ws["B1"] = insured_name
-    ws["B2"] = f"AGE: {age}"
-    ws["B3"] = f"CARRIER: {carrier}"
-    ws["E2"] = f"{remaining_le_months} MONTHS"
-    ws["E3"] = death_benefit
-    ws["E4"] = investment
-
-    # === Auto-calc: next 3 months of premiums (including this month) -> E5 ===
-    now_dt = datetime.now()
-    cur_y, cur_m = now_dt.year, now_dt.month  # 1..12
-
-    # Build (year, month) positions for current month + next two months, handling year wrap
-    positions = []
-    for off in range(3):
-        y = cur_y + ((cur_m - 1 + off) // 12)
-        m = ((cur_m - 1 + off) % 12) + 1
-        positions.append((y, m))
-
-    next_three_sum = sum(
-        _get_monthly_premium_frontfill_tail(monthly_premiums, y, m) for (y, m) in positions
-    )
-    ws["E5"] = next_three_sum
-    ws["E5"].number_format = '"$"#,##0.00'
-    # === end auto-calc E5 ===
+    for addr, value in header.items():
+        ws[addr] = value
+    ws["E5"].number_format = CURRENCY_FORMAT
 
     # Year-by-year table
-    cumulative = 0.0
-    for i in range(total_years):
-        year = start_year + i
-        premium = float(annual_premiums.get(year, 0.0))
-        cumulative += premium
-        total_cost = float(investment) + cumulative
-        profit = float(death_benefit) - total_cost
-        simple_return = (profit / total_cost) if total_cost else 0.0
-        acc_return = (simple_return / (i + 1)) if (i + 1) else 0.0
-
-        marker = ""
-        if i == remaining_le_years - 1:
-            marker = "LE"
-        elif i == remaining_le_years:
-            marker = "LE+1"
-        elif i == remaining_le_years + 1:
-            marker = "LE+2"
-        elif i == remaining_le_years + 2:
-            marker = "LE+3"
-
-        row = [
-            year,
-            premium,
-            cumulative,
-            total_cost,
-            profit,
-            simple_return,
-            acc_return,
-            marker
-        ]
+    for i, row in enumerate(rows):
         ws.append(row)
 
         # Highlight LE row (bold + light blue fill)
@@ -250,28 +227,167 @@ def generate_return_template(
             for col in range(2, 9):  # columns B..H
                 cell = ws.cell(row=6 + i + 1, column=col)  # == row 7 + i
                 cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
+                cell.fill = PatternFill(start_color=LE_FILL_COLOR, end_color=LE_FILL_COLOR, fill_type="solid")
 
     # Number formats for the appended rows
     for row in range(7, 7 + total_years):
         for col in range(2, 6):  # B..E currency
-            ws.cell(row=row, column=col).number_format = '"$"#,##0.00'
+            ws.cell(row=row, column=col).number_format = CURRENCY_FORMAT
         for col in range(6, 8):  # F..G percentages
-            ws.cell(row=row, column=col).number_format = '0.00%'
+            ws.cell(row=row, column=col).number_format = PERCENT_FORMAT
 
     # Copy the style from B6 into column A for all output rows
     ref_style = ws["B6"]._style
     for row in range(7, 7 + total_years):
         ws.cell(row=row, column=1)._style = ref_style
 
-    # Clear any "LE Marker" header label in H6 to keep header area clean
-    if ws["H6"].value == "LE Marker":
-        ws["H6"].value = ""
+    return wb
+
+def _render_return(
+    insured_name: str,
+    dob: str,
+    carrier: str,
+    le_months: int,
+    le_report_date: str,
+    death_benefit: float,
+    investment: float,
+    monthly_premiums: Union[Dict[int, List[float]], PremiumSchedule],
+    write_only: bool = False,
+    simulate_paths: int = 0,
+    as_of: Optional[date] = None
+) -> Workbook:
+    # Shared by generate_return_template and _bytes, which differ only in how they save
+    schedule = PremiumSchedule.coerce(monthly_premiums)
+    figures = purchase_figures(dob, le_months, le_report_date, death_benefit, investment, schedule, as_of=as_of)
+    wb = build_return_workbook(insured_name, carrier, death_benefit, investment, figures, write_only=write_only)
+    if simulate_paths:
+        add_simulation_sheet(wb, simulate_policy(dob, le_months, le_report_date, death_benefit, investment, schedule,
+                                                 n_paths=simulate_paths, seed=SIMULATION_SEED, as_of=figures["as_of"]))
+    return wb
 
-    wb.save(output_filename)
+def generate_return_template(
+    insured_name: str,
+    dob: str,
+    carrier: str,
+    le_months: int,
+    le_report_date: str,
+    death_benefit: float,
+    investment: float,
+    monthly_premiums: Union[Dict[int, List[float]], PremiumSchedule],
+    output_filename: str,
+    write_only: bool = False,
+    simulate_paths: int = 0,
+    as_of: Optional[date] = None
+) -> str:
+    """
+    Build the purchase template. With write_only=True the workbook is streamed
+    through openpyxl's write_only mode (one pass, constant memory) instead of being
+    edited in memory; the output is the same. simulate_paths > 0 adds a Monte Carlo
+    mortality sheet (see mortality_simulation). Figures are valued as of `as_of`
+    (default today).
+    """
+    wb = _render_return(insured_name, dob, carrier, le_months, le_report_date, death_benefit, investment,
+                        monthly_premiums, write_only, simulate_paths, as_of)
+    with span("template.save", output=output_filename):
+        wb.save(output_filename)
     return output_filename
 
+# === Mortality simulation sheet ===
+SIMULATION_SEED = 0  # fixed so the same inputs always render the same workbook
+SIMULATION_SHEET = "Mortality Simulation"
+
+def styled_cell(ws, value, font=None, number_format=None):
+    # Built with WriteOnlyCell so rows can be appended to in-memory and write_only sheets alike
+    cell = WriteOnlyCell(ws, value=value)
+    if font is not None:
+        cell.font = font
+    if number_format:
+        cell.number_format = number_format
+    return cell
+
+@traced("template.style.simulation")
+def add_simulation_sheet(wb: Workbook, result: Dict) -> None:
+    """Append a 'Mortality Simulation' sheet from mortality_simulation.simulate_policy(...)."""
+    ws = wb.create_sheet(SIMULATION_SHEET)
+    for col, width in (("A", 34), ("B", 20), ("C", 18), ("D", 16), ("E", 20)):
+        ws.column_dimensions[col].width = width
+    bold = Font(bold=True)
+
+    summary = [
+        ("MONTE CARLO MORTALITY VALUATION", None, None),
+        ("VALUED AS OF", result["as_of"].strftime("%Y-%m-%d"), None),
+        ("PATHS", result["n_paths"], "0"),
+        ("REMAINING LE (MONTHS, MEDIAN)", result["remaining_le_months"], "0"),
+        ("GOMPERTZ HAZARD NOW (PER YEAR)", result["gompertz"]["hazard_now"], "0.0000"),
+        ("GOMPERTZ SLOPE", result["gompertz"]["slope"], "0.000"),
+        ("PROBABILITY OF MATURITY BY LE", result["prob_mature_by_le"], PERCENT_FORMAT),
+        ("PROBABILITY OF LOSS", result["prob_loss"], PERCENT_FORMAT),
+        ("EXPECTED IRR", result["expected_irr"], PERCENT_FORMAT),
+    ]
+    for label, value, fmt in summary:
+        row = [styled_cell(ws, label, font=bold)]
+        if value is not None:
+            row.append(styled_cell(ws, value, number_format=fmt))
+        ws.append(row)
+    ws.append([])
+
+    columns = (
+        ("MATURITY (MONTHS)", "maturity_months", "0.0"),
+        ("PROFIT", "profit", CURRENCY_FORMAT),
+        ("TOTAL RETURN", "total_return", PERCENT_FORMAT),
+        ("ANNUALIZED RETURN", "annualized_return", PERCENT_FORMAT),
+    )
+    ws.append([styled_cell(ws, label, font=bold) for label in ["PERCENTILE"] + [c[0] for c in columns]])
+    for stat in list(PERCENTILES) + ["mean"]:
+        label = f"P{stat}" if stat != "mean" else "MEAN"
+        ws.append([styled_cell(ws, label, font=bold)]
+                  + [styled_cell(ws, result[key][stat], number_format=fmt) for _, key, fmt in columns])
+
+@traced("template.save")
+def workbook_bytes(wb: Workbook) -> bytes:
+    """Serialize a workbook to xlsx bytes in memory (no file on disk)."""
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+def generate_return_template_bytes(
+    insured_name: str,
+    dob: str,
+    carrier: str,
+    le_months: int,
+    le_report_date: str,
+    death_benefit: float,
+    investment: float,
+    monthly_premiums: Union[Dict[int, List[float]], PremiumSchedule],
+    write_only: bool = False,
+    simulate_paths: int = 0,
+    as_of: Optional[date] = None
+) -> bytes:
+    """Same workbook as generate_return_template, returned as xlsx bytes instead of saved to a file."""
+    return workbook_bytes(_render_return(insured_name, dob, carrier, le_months, le_report_date, death_benefit,
+                                         investment, monthly_premiums, write_only, simulate_paths, as_of))
+
 # === Resale generator (paste near the end of file) ===
+def _render_resale(
+    insured_name: str,
+    dob: str,
+    carrier: str,
+    le_months: int,
+    le_report_date: str,
+    death_benefit: NumberLike,
+    investment: NumberLike,
+    monthly_premiums: Union[Dict, PremiumSchedule],
+    sensitivity: bool = False,
+    as_of: Optional[date] = None
+) -> Workbook:
+    # Shared by generate_resale_template and _bytes, which differ only in how they save
+    schedule = PremiumSchedule.coerce(monthly_premiums)
+    figures = resale_figures(dob, le_months, le_report_date, death_benefit, investment, schedule, as_of=as_of)
+    wb = build_resale_workbook(insured_name, carrier, figures)
+    if sensitivity:
+        add_resale_sensitivity_sheets(wb, resale_grid(le_months, le_report_date, death_benefit, investment, schedule, as_of=figures["as_of"]))
+    return wb
+
 def generate_resale_template(
     insured_name: str,
     dob: str,
@@ -280,100 +396,306 @@ def generate_resale_template(
     le_report_date: str,
     death_benefit: NumberLike,
     investment: NumberLike,              # client’s purchase price (matches E4 in purchase template)
-    monthly_premiums: Dict,              # {year: [months]}
-    output_filename: str = None
+    monthly_premiums: Union[Dict, PremiumSchedule],  # {year: [months]} or a prebuilt schedule
+    output_filename: str = None,
+    sensitivity: bool = False,           # add resale price / return grids over horizon x target return
+    as_of: Optional[date] = None         # valuation date (default today)
 ) -> str:
-    today = date.today()
-    this_year, this_month_idx0 = today.year, today.month - 1  # 0-based month
-    elapsed, remaining_le_months, _ = _elapsed_remaining_le(int(le_months), le_report_date)
-    age = _age_today(dob, le_report_date, elapsed)
+    wb = _render_resale(insured_name, dob, carrier, le_months, le_report_date, death_benefit, investment,
+                        monthly_premiums, sensitivity, as_of)
 
-    premium_map = _normalize_month_map(monthly_premiums)
-    DB = _clean_to_float(death_benefit)
-    COST0 = _clean_to_float(investment)
+    safe = insured_name.lower().replace(" ", "_")
+    out = output_filename or f"resale_template_{safe}.xlsx"
+    with span("template.save", output=out):
+        wb.save(out)
+    return out
 
+def generate_resale_template_bytes(
+    insured_name: str,
+    dob: str,
+    carrier: str,
+    le_months: int,
+    le_report_date: str,
+    death_benefit: NumberLike,
+    investment: NumberLike,
+    monthly_premiums: Union[Dict, PremiumSchedule],
+    sensitivity: bool = False,
+    as_of: Optional[date] = None
+) -> bytes:
+    """Same workbook as generate_resale_template, returned as xlsx bytes instead of saved to a file."""
+    return workbook_bytes(_render_resale(insured_name, dob, carrier, le_months, le_report_date, death_benefit,
+                                         investment, monthly_premiums, sensitivity, as_of))
+
+@traced("template.style.resale")
+def build_resale_workbook(insured_name: str, carrier: str, figures: Dict) -> Workbook:
+    """Fill the resale template from `resale_figures(...)`; the caller saves it."""
     # Load template from repo root (same folder as this .py or project root)
-    here = Path(__file__).resolve().parent
-    candidate_paths = [
-        here / "Resale Template Sample.xlsx",
-        Path.cwd() / "Resale Template Sample.xlsx",
-    ]
-    xlsx_path = next((p for p in candidate_paths if p.exists()), None)
-    if xlsx_path is None:
-        raise FileNotFoundError("Resale Template Sample.xlsx not found in repo. Place it next to template_generator.py or at project root.")
-
-    wb = load_workbook(xlsx_path.as_posix())
+    wb = load_template(RESALE_TEMPLATE_NAME)
     ws = wb.active
 
     # Headers
     ws["B1"].value = insured_name
-    ws["B2"].value = f"AGE: {age}"
+    ws["B2"].value = f"AGE: {figures['age']}"
     ws["B3"].value = f"CARRIER: {carrier}"
-    ws["F1"].value = today.strftime("%Y-%m-%d")
-    ws["F2"].value = f"{remaining_le_months} MONTHS"
-    ws["F3"].value = DB
-    ws["F4"].value = COST0
-
-    # Effective months (B8..B11)
-    B8 = max(remaining_le_months - 24, 0)
-    B9 = max(B8 - 12, 0)
-    B10 = max(B9 - 12, 0)
-    B11 = max(B10 - 12, 0)
-    ws["B8"].value, ws["B9"].value, ws["B10"].value, ws["B11"].value = B8, B9, B10, B11
-
-    # Cumulative premiums from today (C8..C11): 24/36/48/60 months
-    C8 = _sum_next_n_months(this_year, this_month_idx0, 24, premium_map)
-    C9 = _sum_next_n_months(this_year, this_month_idx0, 36, premium_map)
-    C10 = _sum_next_n_months(this_year, this_month_idx0, 48, premium_map)
-    C11 = _sum_next_n_months(this_year, this_month_idx0, 60, premium_map)
-    ws["C8"].value, ws["C9"].value, ws["C10"].value, ws["C11"].value = C8, C9, C10, C11
-
-    # Premiums to LE (baseline) and D8..D11 deltas
-    P_LE = _premiums_to_le(this_year, this_month_idx0, remaining_le_months, premium_map)
-    D8 = max(P_LE - C8, 0.0)
-    D9 = max(P_LE - C9, 0.0)
-    D10 = max(P_LE - C10, 0.0)
-    D11 = max(P_LE - C11, 0.0)
-    ws["D8"].value, ws["D9"].value, ws["D10"].value, ws["D11"].value = D8, D9, D10, D11
-
-    # Resale price (Client 2 buys; 18% avg return to LE)
-    def _resale_price(Bm, Dm):
-        denom = (0.18 * max(Bm, 0)) + 12.0
-        return ((12.0 * DB) - (12.0 * Dm)) / denom if denom > 0 else 0.0
-
-    E8 = _resale_price(B8, D8)
-    E9 = _resale_price(B9, D9)
-    E10 = _resale_price(B10, D10)
-    E11 = _resale_price(B11, D11)
-    ws["E8"].value, ws["E9"].value, ws["E10"].value, ws["E11"].value = E8, E9, E10, E11
-
-    # Client 1 proceeds (F) and annualized returns (G)
-    F8, F9, F10, F11 = E8 - C8 - COST0, E9 - C9 - COST0, E10 - C10 - COST0, E11 - C11 - COST0
-    ws["F8"].value, ws["F9"].value, ws["F10"].value, ws["F11"].value = F8, F9, F10, F11
-
-    def _ann_return(Fm, Cm, yrs):
-        base = COST0 + Cm
-        return (Fm / base / yrs) if base > 0 and yrs > 0 else 0.0
-
-    G8 = _ann_return(F8, C8, 2)
-    G9 = _ann_return(F9, C9, 3)
-    G10 = _ann_return(F10, C10, 4)
-    G11 = _ann_return(F11, C11, 5)
-    ws["G8"].value, ws["G9"].value, ws["G10"].value, ws["G11"].value = G8, G9, G10, G11
+    ws["F1"].value = figures["as_of"].strftime("%Y-%m-%d")
+    ws["F2"].value = f"{figures['remaining_le_months']} MONTHS"
+    ws["F3"].value = figures["death_benefit"]
+    ws["F4"].value = figures["cost"]
+
+    # B: effective months, C: cumulative premiums, D: remaining premiums to LE,
+    # E: resale price, F: Client 1 proceeds, G: annualized return (rows 8..11)
+    for r, values in enumerate(figures["rows"], start=8):
+        for col, value in zip("BCDEFG", values):
+            ws[f"{col}{r}"].value = value
 
     # Formats
     for addr in ("F3","F4","C8","C9","C10","C11","D8","D9","D10","D11","E8","E9","E10","E11","F8","F9","F10","F11"):
-        ws[addr].number_format = '"$"#,##0.00'
+        ws[addr].number_format = CURRENCY_FORMAT
     for addr in ("G8","G9","G10","G11"):
-        ws[addr].number_format = '0.00%'
+        ws[addr].number_format = PERCENT_FORMAT
 
     # Optional visual cue on B8:B11
     fill = PatternFill(start_color="E8F0FE", end_color="E8F0FE", fill_type="solid")
     for r in (8,9,10,11):
         ws[f"B{r}"].fill = fill
 
-    safe = insured_name.lower().replace(" ", "_")
-    out = output_filename or f"resale_template_{safe}.xlsx"
-    wb.save(out)
-    return out
+    return wb
+
+# === Resale sensitivity grid ===
+_GRID_SHEETS = (
+    ("Resale Price Grid", "resale_price", CURRENCY_FORMAT, "EST. RESALE PRICE BY MONTHS FROM NOW (ROWS) AND CLIENT 2 TARGET RETURN (COLUMNS)"),
+    ("Client 1 Return Grid", "annualized_return", PERCENT_FORMAT, "CLIENT 1 ANNUALIZED RETURN BY MONTHS FROM NOW (ROWS) AND CLIENT 2 TARGET RETURN (COLUMNS)"),
+)
+
+@traced("template.style.sensitivity")
+def add_resale_sensitivity_sheets(wb: Workbook, grid: Dict) -> None:
+    """
+    Append one sheet per grid measure (see resale_scenarios.resale_grid): a row per
+    resale month, a column per target return, shaded as a red-to-green heatmap.
+    """
+    months, rates = grid["months"], grid["target_returns"]
+    first_row, first_col = 4, 4  # data starts at D4
+    last_row, last_col = first_row + len(months) - 1, first_col + len(rates) - 1
+    bold = Font(bold=True)
+
+    for title, measure, fmt, caption in _GRID_SHEETS:
+        ws = wb.create_sheet(title)
+        ws["A1"] = caption
+        ws["A1"].font = bold
+        ws["A2"] = f"VALUED AS OF {grid['as_of'].strftime('%Y-%m-%d')}"
+
+        header = ["MONTHS FROM NOW", "EFFECTIVE LE (MONTHS)", "CUMULATIVE PREMIUMS"] + [float(r) for r in rates]
+        for col, value in enumerate(header, start=1):
+            cell = ws.cell(row=first_row - 1, column=col, value=value)
+            cell.font = bold
+            if col >= first_col:
+                cell.number_format = '0.0%'
+
+        values = grid[measure]
+        for i, month in enumerate(months):
+            r = first_row + i
+            ws.cell(row=r, column=1, value=int(month)).font = bold
+            ws.cell(row=r, column=2, value=int(grid["effective_le"][i]))
+            ws.cell(row=r, column=3, value=float(grid["cumulative"][i])).number_format = CURRENCY_FORMAT
+            for j, v in enumerate(values[i].tolist()):
+                ws.cell(row=r, column=first_col + j, value=v).number_format = fmt
+
+        if len(months) and len(rates):
+            ref = f"{get_column_letter(first_col)}{first_row}:{get_column_letter(last_col)}{last_row}"
+            ws.conditional_formatting.add(ref, ColorScaleRule(
+                start_type="min", start_color="F8696B",
+                mid_type="percentile", mid_value=50, mid_color="FFEB84",
+                end_type="max", end_color="63BE7B",
+            ))
+        ws.freeze_panes = ws.cell(row=first_row, column=first_col)
+        for col, width in (("A", 18), ("B", 22), ("C", 22)):
+            ws.column_dimensions[col].width = width
+
+# === Incremental regeneration ===
+# The cells each builder writes, by address. When a policy is re-priced with a new
+# valuation date or client cost and the table shape is unchanged, the previous
+# workbook is updated by writing only the cells whose value differs.
+def return_cell_values(insured_name: str, carrier: str, death_benefit: float, investment: float, figures: Dict) -> Dict[str, object]:
+    cells = {
+        "B1": insured_name,
+        "B2": f"AGE: {figures['age']}",
+        "B3": f"CARRIER: {carrier}",
+        "E2": f"{figures['remaining_le_months']} MONTHS",
+        "E3": death_benefit,
+        "E4": investment,
+        "E5": figures["next_three_sum"],
+    }
+    for r, row in enumerate(figures["rows"], start=RETURN_HEADER_ROWS + 1):
+        for col, value in zip("ABCDEFGH", row):
+            cells[f"{col}{r}"] = value
+    return cells
+
+def resale_cell_values(insured_name: str, carrier: str, figures: Dict) -> Dict[str, object]:
+    cells = {
+        "B1": insured_name,
+        "B2": f"AGE: {figures['age']}",
+        "B3": f"CARRIER: {carrier}",
+        "F1": figures["as_of"].strftime("%Y-%m-%d"),
+        "F2": f"{figures['remaining_le_months']} MONTHS",
+        "F3": figures["death_benefit"],
+        "F4": figures["cost"],
+    }
+    for r, values in enumerate(figures["rows"], start=8):
+        for col, value in zip("BCDEFG", values):
+            cells[f"{col}{r}"] = value
+    return cells
+
+def workbook_shape(kind: str, figures: Dict) -> Tuple:
+    """Everything besides cell values that the rendered layout depends on (rows, LE highlight)."""
+    if kind == "purchase":
+        return (kind, figures["total_years"], figures["remaining_le_years"])
+    return (kind, len(figures["rows"]))
+
+def update_cells(wb: Workbook, old: Dict[str, object], new: Dict[str, object]) -> int:
+    """Write the cells of `new` that differ from `old` into the template sheet; returns the count."""
+    ws = wb.active
+    changed = 0
+    for addr, value in new.items():
+        if addr not in old or old[addr] != value:
+            ws[addr].value = value
+            changed += 1
+    return changed
+
+def remove_extra_sheets(wb: Workbook) -> None:
+    """Drop the optional sensitivity / simulation sheets (they depend on every input)."""
+    for title in [SIMULATION_SHEET] + [t for t, *_ in _GRID_SHEETS]:
+        if title in wb.sheetnames:
+            wb.remove(wb[title])
+
+# === Multi-policy comparison workbook ===
+COMPARISON_SUMMARY_SHEET = "Summary"
+_SHEET_TITLE_BAD = str.maketrans({c: " " for c in "[]:*?/\\"})
+
+def _sheet_title(name: str, used: set) -> str:
+    base = (str(name).translate(_SHEET_TITLE_BAD).strip() or "Policy")[:31]
+    title, n = base, 2
+    while title.lower() in used:
+        suffix = f" ({n})"
+        title, n = base[:31 - len(suffix)] + suffix, n + 1
+    used.add(title.lower())
+    return title
+
+def _comparison_styles(wb: Workbook) -> Dict[str, str]:
+    """Named styles for the year tables, registered once per workbook; returns role -> style name."""
+    base = wb._fonts[0]
+    plain = Font(name=base.name, sz=base.sz)
+    bold = Font(name=base.name, sz=base.sz, bold=True)
+    le_fill = PatternFill(start_color=LE_FILL_COLOR, end_color=LE_FILL_COLOR, fill_type="solid")
+    styles = {
+        "currency": NamedStyle("Policy Currency", font=plain, number_format=CURRENCY_FORMAT),
+        "percent": NamedStyle("Policy Percent", font=plain, number_format=PERCENT_FORMAT),
+        "le_currency": NamedStyle("LE Currency", font=bold, fill=le_fill, number_format=CURRENCY_FORMAT),
+        "le_percent": NamedStyle("LE Percent", font=bold, fill=le_fill, number_format=PERCENT_FORMAT),
+        "le_text": NamedStyle("LE Text", font=bold, fill=le_fill),
+        "header": NamedStyle("Summary Header", font=bold),
+    }
+    for style in styles.values():
+        if style.name not in wb.named_styles:
+            wb.add_named_style(style)
+    return {role: style.name for role, style in styles.items()}
+
+_ROW_ROLES = ("currency", "currency", "currency", "currency", "percent", "percent")  # columns B..G
+
+def _comparison_policy_sheet(wb: Workbook, template_ws, title: str, policy: Dict, figures: Dict, styles: Dict[str, str]) -> None:
+    ws = wb.copy_worksheet(template_ws)
+    ws.title = title
+    ws.freeze_panes = template_ws.freeze_panes
+    for addr, value in return_cell_values(policy["insured_name"], policy["carrier"], policy["death_benefit"],
+                                          policy["investment"], figures).items():
+        ws[addr].value = value
+    if ws["H6"].value == "LE Marker":
+        ws["H6"].value = ""
+    ws["E5"].number_format = CURRENCY_FORMAT  # keep the template header font, like build_return_workbook
+
+    year_style = template_ws["B6"]._style
+    le_index = figures["remaining_le_years"] - 1
+    for i in range(figures["total_years"]):
+        r = RETURN_HEADER_ROWS + 1 + i
+        ws.cell(row=r, column=1)._style = copy(year_style)
+        le = i == le_index
+        for col, role in enumerate(_ROW_ROLES, start=2):
+            ws.cell(row=r, column=col).style = styles[f"le_{role}" if le else role]
+        if le:
+            ws.cell(row=r, column=8).style = styles["le_text"]
+
+def _comparison_summary_row(policy: Dict, purchase: Dict, resale: Dict) -> List:
+    rows = purchase["rows"]
+    le_row = rows[purchase["remaining_le_years"] - 1] if purchase["remaining_le_years"] > 0 else None
+    return [
+        policy["insured_name"],
+        policy["carrier"],
+        purchase["age"],
+        purchase["remaining_le_months"],
+        policy["death_benefit"],
+        policy["investment"],
+        le_row[2] if le_row else 0.0,      # cumulative premiums to LE
+        le_row[5] if le_row else None,     # total return at LE
+        le_row[6] if le_row else None,     # annualized return at LE
+    ] + [row[5] for row in resale["rows"]]  # Client 1 annualized return on resale at 24..60 months
+
+@traced("template.style.comparison")
+def build_comparison_workbook(policies: List[Dict], as_of: Optional[date] = None) -> Workbook:
+    """
+    One workbook comparing several policies: a Summary sheet (LE, DB, cost, return
+    at LE, resale returns) followed by a purchase-template sheet per policy.
+    `policies` hold the generator keyword arguments (insured_name, dob, carrier,
+    le_months, le_report_date, death_benefit, investment, monthly_premiums).
+
+    The template is loaded once and copied per policy with copy_worksheet, and the
+    table styles are named styles registered once, so every sheet shares the same
+    style records.
+    """
+    if not policies:
+        raise ValueError("No policies to compare.")
+    as_of = as_of or date.today()
+    wb = load_template(RETURN_TEMPLATE_NAME, prepare=reset_return_template)
+    template_ws = wb.active
+    styles = _comparison_styles(wb)
+
+    summary = wb.create_sheet(COMPARISON_SUMMARY_SHEET, 0)
+    headers = ["INSURED", "CARRIER", "AGE", "REMAINING LE (MONTHS)", "DEATH BENEFIT", "CLIENT COST",
+               "PREMIUMS TO LE", "TOTAL RETURN AT LE", "ANNUALIZED RETURN AT LE"]
+    headers += [f"RESALE AT {m} MO. (ANNUALIZED)" for m in RESALE_HORIZONS]
+    summary.append(headers)
+    for cell in summary[1]:
+        cell.style = styles["header"]
+
+    used = {COMPARISON_SUMMARY_SHEET.lower(), template_ws.title.lower()}
+    for policy in policies:
+        schedule = PremiumSchedule.coerce(policy["monthly_premiums"])
+        args = (policy["dob"], policy["le_months"], policy["le_report_date"], policy["death_benefit"], policy["investment"], schedule)
+        purchase = purchase_figures(*args, as_of=as_of)
+        resale = resale_figures(*args, as_of=as_of)
+        title = _sheet_title(policy["insured_name"], used)
+        _comparison_policy_sheet(wb, template_ws, title, policy, purchase, styles)
+
+        summary.append(_comparison_summary_row(policy, purchase, resale))
+        r = summary.max_row
+        link = summary.cell(row=r, column=1)
+        link.hyperlink = Hyperlink(ref=link.coordinate, location="'{}'!A1".format(title.replace("'", "''")))
+        for col in (5, 6, 7):
+            summary.cell(row=r, column=col).style = styles["currency"]
+        for col in range(8, len(headers) + 1):
+            summary.cell(row=r, column=col).style = styles["percent"]
+
+    wb.remove(template_ws)
+    wb.active = 0
+    summary.freeze_panes = "B2"
+    for col, width in zip("ABCDEFGHIJKLM", (28, 20, 8, 14, 18, 18, 18, 14, 14, 14, 14, 14, 14)):
+        summary.column_dimensions[col].width = width
+    return wb
+
+def generate_comparison_workbook(policies: List[Dict], output_filename: str, as_of: Optional[date] = None) -> str:
+    wb = build_comparison_workbook(policies, as_of=as_of)
+    with span("template.save", output=output_filename):
+        wb.save(output_filename)
+    return output_filename
+
+def generate_comparison_workbook_bytes(policies: List[Dict], as_of: Optional[date] = None) -> bytes:
+    return workbook_bytes(build_comparison_workbook(policies, as_of=as_of))
 # === end generator ===
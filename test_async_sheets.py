@@ -0,0 +1,306 @@
+"""async_sheets against a local fake of the Sheets v4 values API (stdlib http.server)."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pytest
+
+from async_sheets import AsyncSheetsClient, SheetsAPIError, TokenBucket
+
+KEY = "fake-key"
+
+
+class FakeSheets:
+    """Worksheets as lists of rows; `failures` is a list of statuses returned before any success."""
+
+    def __init__(self, sheets, delay=0.0):
+        self.sheets = sheets
+        self.delay = delay
+        self.failures = []
+        self.append_status = None   # fixed error status for every append
+        self.appends = []           # (range, rows) in arrival order
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+
+def _make_handler(fake: FakeSheets):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, method):
+            with fake.lock:
+                fake.requests += 1
+                fake.in_flight += 1
+                fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                status = fake.failures.pop(0) if fake.failures else None
+            try:
+                time.sleep(fake.delay)
+                if status is not None:
+                    return self._reply(status, {"error": {"code": status}})
+                url = urlparse(self.path)
+                prefix = f"/v4/spreadsheets/{KEY}/values"
+                assert url.path.startswith(prefix), url.path
+                rest = url.path[len(prefix):]
+                if method == "POST":
+                    body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                    if fake.append_status is not None:
+                        return self._reply(fake.append_status, {"error": {"code": fake.append_status}})
+                    with fake.lock:
+                        fake.appends.append((unquote(rest[1:].rsplit(":", 1)[0]), body["values"]))
+                    return self._reply(200, {"updates": {"updatedRows": len(body["values"])}})
+                if rest == ":batchGet":
+                    ranges = parse_qs(url.query)["ranges"]
+                    return self._reply(200, {"valueRanges": [{"values": self._values(r)} for r in ranges]})
+                return self._reply(200, {"values": self._values(unquote(rest[1:]))})
+            finally:
+                with fake.lock:
+                    fake.in_flight -= 1
+
+        def _values(self, range_):
+            title = range_.split("!")[0].strip("'")
+            return fake.sheets.get(title, [])
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+    return Handler
+
+
+@pytest.fixture
+def fake():
+    state = FakeSheets({
+        "Sheet1": [["insured_name", "le_months"], ["A", "60"], ["B", "48"]],
+        "Archive": [["insured_name", "le_months"], ["C", "12"]],
+        "Other": [["x"], ["1"]],
+        "Empty": [],
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(state))
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    state.url = f"http://127.0.0.1:{server.server_port}/v4"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def _client(fake, **kwargs):
+    kwargs.setdefault("requests_per_minute", 6000)
+    kwargs.setdefault("burst", 100)
+    kwargs.setdefault("base_delay", 0.01)
+    return AsyncSheetsClient(KEY, base_url=fake.url, token="test-token", **kwargs)
+
+
+def test_fetch_worksheets_runs_concurrently(fake):
+    fake.delay = 0.2
+    titles = ["Sheet1", "Archive", "Other", "Empty"]
+
+    t0 = time.perf_counter()
+    records = asyncio.run(_client(fake).fetch_worksheets(titles))
+    elapsed = time.perf_counter() - t0
+
+    assert list(records) == titles
+    assert records["Sheet1"] == [{"insured_name": "A", "le_months": 60}, {"insured_name": "B", "le_months": 48}]
+    assert records["Empty"] == []
+    assert fake.max_in_flight >= 2
+    assert elapsed < 0.2 * len(titles)
+
+
+def test_get_many_keeps_input_order_and_respects_max_concurrency(fake):
+    fake.delay = 0.05
+    ranges = ["'Other'!A1:A2", "'Sheet1'!A1:B3", "'Archive'!A1:B2"] * 3
+
+    values = asyncio.run(_client(fake, max_concurrency=2).get_many(ranges))
+
+    assert values == [fake.sheets[r.split("!")[0].strip("'")] for r in ranges]
+    assert fake.max_in_flight <= 2
+
+
+def test_batch_get_is_one_request(fake):
+    values = asyncio.run(_client(fake).batch_get(["'Sheet1'!A:B", "'Archive'!A:B"]))
+    assert values == [fake.sheets["Sheet1"], fake.sheets["Archive"]]
+    assert fake.requests == 1
+
+
+def test_retries_429_and_5xx(fake):
+    fake.failures = [429, 503, 500]
+    client = _client(fake)
+
+    values = asyncio.run(client.get_values("'Other'!A:A"))
+
+    assert values == fake.sheets["Other"]
+    assert client.stats == {"requests": 4, "retries": 3}
+
+
+def test_client_errors_are_not_retried(fake):
+    fake.failures = [400]
+    client = _client(fake)
+
+    with pytest.raises(SheetsAPIError) as e:
+        asyncio.run(client.get_values("'Other'!A:A"))
+
+    assert e.value.status == 400 and not e.value.retryable
+    assert client.stats == {"requests": 1, "retries": 0}
+
+
+def test_retries_give_up_after_max_retries(fake):
+    fake.failures = [503] * 5
+    client = _client(fake, max_retries=2)
+
+    with pytest.raises(SheetsAPIError) as e:
+        asyncio.run(client.get_values("'Other'!A:A"))
+
+    assert e.value.status == 503
+    assert client.stats == {"requests": 3, "retries": 2}
+
+
+def test_token_bucket_paces_after_burst():
+    async def acquire_all(bucket, n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    bucket = TokenBucket(rate=20.0, capacity=2)
+    t0 = time.perf_counter()
+    asyncio.run(acquire_all(bucket, 6))
+    # 2 from the burst, then 4 more at 20/s
+    assert time.perf_counter() - t0 >= 4 / 20.0 * 0.9
+
+
+def test_token_bucket_with_fake_clock_refills_up_to_capacity():
+    now = [0.0]
+    bucket = TokenBucket(rate=1.0, capacity=3, clock=lambda: now[0])
+    asyncio.run(bucket.acquire(3))
+    now[0] = 100.0
+    bucket._refill()
+    assert bucket._tokens == 3.0
+
+
+def test_client_requests_are_rate_limited(fake):
+    client = _client(fake, requests_per_minute=600, burst=1)   # 10 requests/s
+
+    t0 = time.perf_counter()
+    asyncio.run(client.get_many(["'Other'!A:A"] * 5))
+
+    assert time.perf_counter() - t0 >= 4 / 10.0 * 0.9
+
+
+def test_pipeline_appends_in_order_in_batches(fake):
+    rows = [[f"name {i}", i] for i in range(500)]
+
+    async def go():
+        client = _client(fake)
+        async with client.pipeline("Sheet1", max_batch=50) as p:
+            futures = [await p.submit(row) for row in rows]
+        return p, futures
+
+    p, futures = asyncio.run(go())
+
+    assert p.written == 500
+    assert all(f.done() and f.exception() is None for f in futures)
+    assert all(len(batch) <= 50 for _, batch in fake.appends)
+    assert [r for _, batch in fake.appends for r in batch] == rows
+    assert {range_ for range_, _ in fake.appends} == {"'Sheet1'!A1"}
+
+
+def test_pipeline_failure_is_raised_and_later_rows_are_not_sent(fake):
+    fake.append_status = 400
+
+    async def go():
+        client = _client(fake)
+        async with client.pipeline("Sheet1", max_batch=10) as p:
+            for i in range(35):
+                await p.submit([i])
+        return p
+
+    loop_errors = []
+
+    def run_checked():
+        loop = asyncio.new_event_loop()
+        loop.set_exception_handler(lambda _loop, ctx: loop_errors.append(ctx["message"]))
+        try:
+            return loop.run_until_complete(go())
+        finally:
+            loop.close()
+
+    with pytest.raises(SheetsAPIError) as e:
+        run_checked()
+
+    assert e.value.status == 400
+    assert fake.requests == 1
+    assert loop_errors == []
+
+
+def test_pipeline_flush_raises_and_futures_carry_the_error(fake):
+    fake.failures = [400]
+
+    async def go():
+        p = _client(fake).pipeline("Sheet1")
+        fut = await p.submit(["x"])
+        with pytest.raises(SheetsAPIError):
+            await p.flush()
+        with pytest.raises(SheetsAPIError):
+            await fut
+        with pytest.raises(SheetsAPIError):
+            await p.aclose()
+        return p
+
+    assert asyncio.run(go()).written == 0
+
+
+def test_client_is_reusable_across_run_calls(fake):
+    fake.delay = 0.02
+    client = _client(fake, max_concurrency=2)
+
+    first = asyncio.run(client.get_many(["'Other'!A:A"] * 6))
+    second = asyncio.run(client.get_many(["'Other'!A:A"] * 6))
+
+    assert first == second == [fake.sheets["Other"]] * 6
+    assert fake.max_in_flight <= 2
+
+
+def test_rate_limit_carries_over_between_run_calls(fake):
+    client = _client(fake, requests_per_minute=600, burst=1)   # 10 requests/s
+
+    t0 = time.perf_counter()
+    asyncio.run(client.get_many(["'Other'!A:A"] * 3))
+    asyncio.run(client.get_many(["'Other'!A:A"] * 3))
+
+    # one from the burst, then 5 more at 10/s, whichever loop they run on
+    assert time.perf_counter() - t0 >= 5 / 10.0 * 0.9
+
+
+def test_append_is_not_resent_after_5xx(fake):
+    fake.failures = [503]
+    client = _client(fake)
+
+    with pytest.raises(SheetsAPIError) as e:
+        asyncio.run(client.append_rows("Sheet1", [["x"]]))
+
+    assert e.value.status == 503
+    assert client.stats == {"requests": 1, "retries": 0}
+
+
+def test_append_is_retried_after_429(fake):
+    fake.failures = [429]
+    client = _client(fake)
+
+    asyncio.run(client.append_rows("Sheet1", [["x"]]))
+
+    assert client.stats == {"requests": 2, "retries": 1}
+    assert fake.appends == [("'Sheet1'!A1", [["x"]])]
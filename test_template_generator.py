@@ -0,0 +1,67 @@
+"""The streamed (write_only) purchase workbook must match the in-memory one cell for cell."""
+from datetime import date
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+from openpyxl.cell.cell import MergedCell
+
+from template_generator import generate_return_template_bytes
+
+AS_OF = date(2026, 10, 17)
+
+POLICIES = [
+    dict(insured_name="John Doe", dob="1940-05-01", carrier="ACME", le_months=60, le_report_date="2024-03-15",
+         death_benefit=1000000.0, investment=150000.0,
+         monthly_premiums={2026: [1000] * 12, 2027: ["$1,200"] * 12, 2028: [1300] * 9, 2029: [1400] * 12}),
+    dict(insured_name="Jane Roe", dob="1935-01-20", carrier="Life Co", le_months=30, le_report_date="2025-06-01",
+         death_benefit=500000, investment=80000, monthly_premiums={2026: [500] * 5, 2027: [600] * 12}),
+    dict(insured_name="Short LE", dob="1930-01-01", carrier="X", le_months=3, le_report_date="2022-01-01",
+         death_benefit=250000, investment=0, monthly_premiums={}),
+]
+
+
+def _cells(data: bytes):
+    ws = load_workbook(BytesIO(data)).active
+    cells = {}
+    for row in ws.iter_rows():
+        for c in row:
+            if c.value is None and not c.has_style:
+                continue
+            if isinstance(c, MergedCell):
+                # openpyxl reloads covered cells with their border only, so the rest
+                # reads as the workbook's first font, which Excel never draws
+                cells[c.coordinate] = (c.border.left.style, c.border.right.style, c.border.top.style, c.border.bottom.style)
+                continue
+            cells[c.coordinate] = (
+                c.value,
+                c.number_format,
+                (c.font.name, c.font.sz, bool(c.font.b), bool(c.font.i)),
+                (c.fill.fill_type, c.fill.fgColor.rgb if c.fill.fill_type else None),
+                (c.border.left.style, c.border.right.style, c.border.top.style, c.border.bottom.style),
+                (c.alignment.horizontal, c.alignment.vertical, bool(c.alignment.wrap_text)),
+            )
+    # Heights only for rows that hold the table: the in-memory path also keeps the
+    # template's heights on the empty rows below it, which a streamed sheet never writes
+    last_row = max((int("".join(ch for ch in addr if ch.isdigit())) for addr in cells), default=0)
+    layout = (
+        sorted(map(str, ws.merged_cells.ranges)),
+        {k: d.width for k, d in ws.column_dimensions.items() if d.width},
+        {k: d.height for k, d in ws.row_dimensions.items() if d.height and k <= last_row},
+        ws.freeze_panes,
+    )
+    return cells, layout
+
+
+@pytest.mark.parametrize("policy", POLICIES, ids=[p["insured_name"] for p in POLICIES])
+def test_write_only_matches_in_memory(policy):
+    in_memory = generate_return_template_bytes(**policy, as_of=AS_OF)
+    streamed = generate_return_template_bytes(**policy, write_only=True, as_of=AS_OF)
+
+    mem_cells, mem_layout = _cells(in_memory)
+    stream_cells, stream_layout = _cells(streamed)
+
+    assert stream_layout == mem_layout
+    assert sorted(stream_cells) == sorted(mem_cells)
+    for addr in mem_cells:
+        assert stream_cells[addr] == mem_cells[addr], addr